@@ -0,0 +1,59 @@
+"""add unique index to experiments.name
+
+Revision ID: c7e41a9d2b63
+Revises: 583485c18eff
+Create Date: 2026-10-15 10:12:40.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy import text
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c7e41a9d2b63'
+down_revision: Union[str, None] = '583485c18eff'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Handle duplicate names before adding the unique index
+    bind = op.get_bind()
+    
+    duplicates = bind.execute(text("""
+        SELECT name, GROUP_CONCAT(id ORDER BY id) as ids
+        FROM experiments
+        GROUP BY name
+        HAVING COUNT(*) > 1
+    """)).fetchall()
+    
+    # Keep the first experiment with each name, rename the others
+    for row in duplicates:
+        name = row[0]
+        ids = [int(id_str) for id_str in row[1].split(',')]
+        for experiment_id in ids[1:]:
+            new_name = f"{name}_{experiment_id}"
+            counter = 1
+            while bind.execute(
+                text("SELECT COUNT(*) FROM experiments WHERE name = :new_name"),
+                {"new_name": new_name}
+            ).scalar() > 0:
+                new_name = f"{name}_{experiment_id}_{counter}"
+                counter += 1
+            
+            bind.execute(
+                text("UPDATE experiments SET name = :new_name WHERE id = :id"),
+                {"new_name": new_name, "id": experiment_id}
+            )
+    
+    # Replace the plain name index with a unique one
+    op.drop_index(op.f('ix_experiments_name'), table_name='experiments')
+    op.create_index(op.f('ix_experiments_name'), 'experiments', ['name'], unique=True)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_experiments_name'), table_name='experiments')
+    op.create_index(op.f('ix_experiments_name'), 'experiments', ['name'], unique=False)
@@ -0,0 +1,33 @@
+"""add composite trace indexes to experiment_results
+
+Revision ID: e3b8f1c5a902
+Revises: c7e41a9d2b63
+Create Date: 2026-10-15 23:30:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e3b8f1c5a902'
+down_revision: Union[str, None] = 'c7e41a9d2b63'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Cover the experiment/run -> trace lookups used by the observability views
+    op.create_index('idx_result_experiment_trace', 'experiment_results', ['experiment_id', 'trace_id'], unique=False)
+    op.create_index('idx_result_run_trace', 'experiment_results', ['run_id', 'trace_id'], unique=False)
+
+
+def downgrade() -> None:
+    # InnoDB may have dropped the implicit foreign key indexes on experiment_id and
+    # run_id once the composites covered them; recreate single-column indexes first,
+    # otherwise dropping the composites fails with error 1553
+    op.create_index('ix_experiment_results_experiment_id', 'experiment_results', ['experiment_id'], unique=False)
+    op.create_index('ix_experiment_results_run_id', 'experiment_results', ['run_id'], unique=False)
+    op.drop_index('idx_result_run_trace', table_name='experiment_results')
+    op.drop_index('idx_result_experiment_trace', table_name='experiment_results')
@@ -0,0 +1,35 @@
+"""store model_sets.updated_at with fractional seconds
+
+Revision ID: f5a2c8d41e77
+Revises: e3b8f1c5a902
+Create Date: 2026-10-16 10:05:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import mysql
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f5a2c8d41e77'
+down_revision: Union[str, None] = 'e3b8f1c5a902'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # updated_at versions the per-process debug config cache; with second
+    # resolution two updates in the same second looked identical to other workers
+    op.alter_column('model_sets', 'updated_at',
+                    existing_type=sa.DateTime(),
+                    type_=mysql.DATETIME(fsp=6),
+                    existing_nullable=True)
+
+
+def downgrade() -> None:
+    op.alter_column('model_sets', 'updated_at',
+                    existing_type=mysql.DATETIME(fsp=6),
+                    type_=sa.DateTime(),
+                    existing_nullable=True)
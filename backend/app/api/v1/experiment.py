@@ -3,6 +3,7 @@ Experiment API endpoints
 """
 from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlalchemy.orm import Session
+from sqlalchemy.exc import IntegrityError
 from typing import List, Optional, Dict, Any
 from pydantic import BaseModel, ConfigDict
 from datetime import datetime
@@ -18,6 +19,7 @@ from app.tasks.celery_app import celery_app
 from app.services.experiment_export_service import ExperimentExportService
 from app.services.experiment_comparison_service import ExperimentComparisonService
 from app.utils.api_decorators import handle_api_errors, handle_not_found
+from app.utils.db_errors import is_unique_violation
 from fastapi.responses import FileResponse
 import os
 
@@ -180,14 +182,19 @@ async def create_experiment(data: ExperimentCreate, db: Session = Depends(get_db
         raise HTTPException(status_code=400, detail=f"Group with id {group_id} not found")
     
     service = ExperimentService(db)
-    experiment = service.create_experiment(
-        name=data.name,
-        dataset_version_id=data.dataset_version_id,
-        evaluation_target_config=data.evaluation_target_config,
-        evaluator_version_ids=data.evaluator_version_ids or [],
-        description=data.description,
-        group_id=group_id,
-    )
+    try:
+        experiment = service.create_experiment(
+            name=data.name,
+            dataset_version_id=data.dataset_version_id,
+            evaluation_target_config=data.evaluation_target_config,
+            evaluator_version_ids=data.evaluator_version_ids or [],
+            description=data.description,
+            group_id=group_id,
+        )
+    except IntegrityError as e:
+        if not is_unique_violation(e):
+            raise
+        raise HTTPException(status_code=400, detail="已存在对应记录，请修改名称")
     return experiment
 
 
@@ -434,6 +441,10 @@ async def clone_experiment(experiment_id: int, data: ExperimentClone, db: Sessio
         return cloned
     except ValueError as e:
         raise HTTPException(status_code=404, detail=str(e))
+    except IntegrityError as e:
+        if not is_unique_violation(e):
+            raise
+        raise HTTPException(status_code=400, detail="已存在对应记录，请修改名称")
 
 
 @router.post("/{experiment_id}/retry")
@@ -1,11 +1,13 @@
 """
 Model configuration API endpoints
 """
+import json
 from fastapi import APIRouter, Depends, HTTPException
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
 from typing import List, Optional, Dict, Any
 from pydantic import BaseModel
-from app.core.database import get_db
+from app.core.database import get_db, SessionLocal
 from app.services.model_config_service import ModelConfigService
 from app.utils.api_decorators import handle_api_errors, handle_not_found
 
@@ -47,11 +49,14 @@ async def get_all_configs(
     skip: int = 0,
     limit: int = 100,
     name: Optional[str] = None,
+    name_prefix: bool = False,
     db: Session = Depends(get_db)
 ):
     """Get all model configurations with pagination and search"""
     service = ModelConfigService(db)
-    configs, total = service.get_all_configs(include_sensitive=include_sensitive, skip=skip, limit=limit, name=name)
+    configs, total = service.get_all_configs(
+        include_sensitive=include_sensitive, skip=skip, limit=limit, name=name, name_prefix=name_prefix
+    )
     return {
         "success": True,
         "data": configs,
@@ -60,6 +65,27 @@ async def get_all_configs(
     }
 
 
+@router.get("/export")
+def export_configs(
+    include_sensitive: bool = False,
+    name: Optional[str] = None,
+    name_prefix: bool = False,
+):
+    """Export all model configurations as newline-delimited JSON"""
+    # The request-scoped session from get_db is closed before the body is
+    # streamed, so the generator owns its own session
+    def generate():
+        db = SessionLocal()
+        try:
+            service = ModelConfigService(db)
+            for config in service.iter_configs(include_sensitive=include_sensitive, name=name, name_prefix=name_prefix):
+                yield json.dumps(config, ensure_ascii=False) + "\n"
+        finally:
+            db.close()
+    
+    return StreamingResponse(generate(), media_type="application/x-ndjson")
+
+
 @router.get("/{config_id}", response_model=Dict[str, Any])
 @handle_not_found("Configuration not found")
 async def get_config_by_id(
@@ -38,15 +38,22 @@ async def get_all_model_sets(
     skip: int = 0,
     limit: int = 100,
     name: Optional[str] = None,
+    after_id: Optional[int] = None,
+    include_total: bool = True,
+    name_prefix: bool = False,
     db: Session = Depends(get_db)
 ):
-    """Get all model sets with pagination and search"""
+    """Get all model sets with pagination and search (pass next_cursor back as after_id for the next page)"""
     service = ModelSetService(db)
-    model_sets, total = service.get_all_model_sets(skip=skip, limit=limit, name=name)
+    model_sets, total, next_cursor = service.get_all_model_sets(
+        skip=skip, limit=limit, name=name, after_id=after_id, include_total=include_total,
+        name_prefix=name_prefix
+    )
     return {
         "success": True,
         "data": model_sets,
         "total": total,
+        "next_cursor": next_cursor,
         "message": "Get model sets successfully"
     }
 
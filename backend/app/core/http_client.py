@@ -0,0 +1,45 @@
+"""
+Shared HTTP client
+"""
+from typing import Optional
+import httpx
+
+# HTTP/2 needs the optional h2 package (httpx[http2])
+try:
+    import h2  # noqa: F401
+    HAS_HTTP2 = True
+except ImportError:
+    HAS_HTTP2 = False
+
+# Process-wide client so connections (TCP/TLS) are pooled across requests.
+# It is bound to the event loop it is first used on, so only use it from
+# the FastAPI app's loop (not from Celery tasks that spin up their own loops).
+_http_client: Optional[httpx.AsyncClient] = None
+
+
+def get_http_client() -> httpx.AsyncClient:
+    """
+    Get the shared async HTTP client, creating it on first use
+
+    Returns:
+        httpx.AsyncClient instance
+    """
+    global _http_client
+
+    if _http_client is None or _http_client.is_closed:
+        _http_client = httpx.AsyncClient(
+            timeout=httpx.Timeout(60.0),
+            limits=httpx.Limits(max_connections=100, max_keepalive_connections=20, keepalive_expiry=60),
+            http2=HAS_HTTP2,
+        )
+
+    return _http_client
+
+
+async def close_http_client() -> None:
+    """Close the shared HTTP client (called on application shutdown)"""
+    global _http_client
+
+    if _http_client is not None:
+        await _http_client.aclose()
+        _http_client = None
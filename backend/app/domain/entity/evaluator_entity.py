@@ -44,6 +44,14 @@ class Content(BaseModel):
         """获取内容类型"""
         return self.content_type or ContentType.TEXT
 
+    def to_log_dict(self) -> Dict[str, Any]:
+        """转换为日志/Span 记录使用的精简字典"""
+        return {
+            "text": self.text,
+            "format": self.format,
+            "content_type": self.content_type.value if self.content_type else None,
+        }
+
 
 class Message(BaseModel):
     """消息结构（用于 Prompt 评估器）"""
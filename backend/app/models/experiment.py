@@ -1,7 +1,7 @@
 """
 Experiment models
 """
-from sqlalchemy import Column, Integer, String, Text, DateTime, JSON, ForeignKey, Float, Enum as SQLEnum
+from sqlalchemy import Column, Integer, String, Text, DateTime, JSON, ForeignKey, Float, Index, Enum as SQLEnum
 from sqlalchemy.orm import relationship
 from datetime import datetime
 from app.core.database import Base
@@ -55,7 +55,7 @@ class Experiment(Base):
     __tablename__ = "experiments"
 
     id = Column(Integer, primary_key=True, index=True)
-    name = Column(String(255), nullable=False, index=True)
+    name = Column(String(255), nullable=False, unique=True, index=True)
     description = Column(Text, nullable=True)
     dataset_version_id = Column(Integer, ForeignKey("dataset_versions.id"), nullable=False)
     
@@ -113,6 +113,10 @@ class ExperimentRun(Base):
 
 class ExperimentResult(Base):
     __tablename__ = "experiment_results"
+    __table_args__ = (
+        Index('idx_result_experiment_trace', 'experiment_id', 'trace_id'),
+        Index('idx_result_run_trace', 'run_id', 'trace_id'),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     experiment_id = Column(Integer, ForeignKey("experiments.id"), nullable=False)
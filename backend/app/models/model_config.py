@@ -6,6 +6,11 @@ from datetime import datetime
 from app.core.database import Base
 
 
+def _utcnow_seconds() -> datetime:
+    """Current UTC time in whole seconds, the precision the DATETIME columns store"""
+    return datetime.utcnow().replace(microsecond=0)
+
+
 class ModelConfig(Base):
     __tablename__ = "model_configs"
 
@@ -20,7 +25,8 @@ class ModelConfig(Base):
     timeout = Column(Integer, default=60, nullable=False)  # Request timeout in seconds (default 60)
     is_enabled = Column(Boolean, default=False, nullable=False)  # Enable/disable flag
     
-    created_at = Column(DateTime, default=datetime.utcnow)
-    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    # Truncated so responses serialized before commit match what a later read returns
+    created_at = Column(DateTime, default=_utcnow_seconds)
+    updated_at = Column(DateTime, default=_utcnow_seconds, onupdate=_utcnow_seconds)
     created_by = Column(String(100), nullable=True)
 
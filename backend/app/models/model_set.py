@@ -2,6 +2,7 @@
 Model set models
 """
 from sqlalchemy import Column, Integer, String, Text, DateTime, JSON
+from sqlalchemy.dialects import mysql
 from datetime import datetime
 from app.core.database import Base
 
@@ -15,6 +16,7 @@ class ModelSet(Base):
     type = Column(String(50), nullable=False)  # agent_api, llm_model
     config = Column(JSON, nullable=False)  # Configuration based on type
     created_at = Column(DateTime, default=datetime.utcnow)
-    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    # Fractional seconds on MySQL: updated_at versions the debug config cache
+    updated_at = Column(DateTime().with_variant(mysql.DATETIME(fsp=6), 'mysql'), default=datetime.utcnow, onupdate=datetime.utcnow)
     created_by = Column(String(100), nullable=True)
 
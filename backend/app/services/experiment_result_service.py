@@ -2,8 +2,10 @@
 Experiment result service - handles experiment result queries and statistics
 """
 from sqlalchemy.orm import Session
+from sqlalchemy import func
 from typing import List, Optional, Dict, Any
 from app.models.experiment import Experiment, ExperimentResult
+from app.models.evaluator_record import EvaluatorRecord
 from app.services.experiment_aggregate_service import ExperimentAggregateService
 
 
@@ -52,12 +54,6 @@ class ExperimentResultService:
         run_id: Optional[int] = None
     ) -> Dict[str, Any]:
         """Get experiment statistics"""
-        from app.models.evaluator_record import EvaluatorRecord
-        import json
-        import logging
-        
-        logger = logging.getLogger(__name__)
-        
         experiment = self.db.query(Experiment).filter(Experiment.id == experiment_id).first()
         if not experiment:
             raise ValueError(f"Experiment {experiment_id} not found")
@@ -65,41 +61,18 @@ class ExperimentResultService:
         results = self.get_results(experiment_id, run_id)
         
         total_count = len(results)
-        success_count = len([r for r in results if r.score is not None])
+        success_count = 0
+        pending_count = 0
+        for r in results:
+            if r.score is not None:
+                success_count += 1
+            elif not r.error_message:
+                pending_count += 1
         failure_count = total_count - success_count
-        pending_count = len([r for r in results if r.score is None and not r.error_message])
         
         aggregate_results = self.calculate_aggregate_results(experiment_id, run_id, save=False)
         
-        evaluator_records_query = self.db.query(EvaluatorRecord).filter(
-            EvaluatorRecord.experiment_id == experiment_id
-        )
-        if run_id:
-            evaluator_records_query = evaluator_records_query.filter(
-                EvaluatorRecord.experiment_run_id == run_id
-            )
-        evaluator_records = evaluator_records_query.all()
-        
-        total_input_tokens = 0
-        total_output_tokens = 0
-        
-        for record in evaluator_records:
-            output_data = record.output_data or {}
-            evaluator_usage = output_data.get("evaluator_usage", {})
-            
-            if isinstance(evaluator_usage, dict):
-                input_tokens = evaluator_usage.get("input_tokens", 0)
-                output_tokens = evaluator_usage.get("output_tokens", 0)
-                
-                if isinstance(input_tokens, (int, float)) and input_tokens:
-                    total_input_tokens += int(input_tokens)
-                if isinstance(output_tokens, (int, float)) and output_tokens:
-                    total_output_tokens += int(output_tokens)
-        
-        token_usage = {
-            "input_tokens": total_input_tokens,
-            "output_tokens": total_output_tokens
-        }
+        token_usage = self._sum_evaluator_token_usage(experiment_id, run_id)
         
         return {
             "experiment_id": experiment_id,
@@ -110,4 +83,25 @@ class ExperimentResultService:
             "evaluator_aggregate_results": aggregate_results,
             "token_usage": token_usage
         }
-
+    
+    def _sum_evaluator_token_usage(
+        self,
+        experiment_id: int,
+        run_id: Optional[int] = None
+    ) -> Dict[str, int]:
+        """Sum evaluator token usage stored in evaluator_records.output_data in SQL"""
+        input_tokens = EvaluatorRecord.output_data[("evaluator_usage", "input_tokens")].as_integer()
+        output_tokens = EvaluatorRecord.output_data[("evaluator_usage", "output_tokens")].as_integer()
+        
+        query = self.db.query(
+            func.coalesce(func.sum(input_tokens), 0),
+            func.coalesce(func.sum(output_tokens), 0),
+        ).filter(EvaluatorRecord.experiment_id == experiment_id)
+        if run_id:
+            query = query.filter(EvaluatorRecord.experiment_run_id == run_id)
+        total_input_tokens, total_output_tokens = query.one()
+        
+        return {
+            "input_tokens": int(total_input_tokens or 0),
+            "output_tokens": int(total_output_tokens or 0)
+        }
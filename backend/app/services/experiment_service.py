@@ -3,15 +3,16 @@ Experiment service
 """
 from sqlalchemy.orm import Session
 from sqlalchemy import text
-from sqlalchemy.exc import InvalidRequestError, PendingRollbackError
+from sqlalchemy.exc import IntegrityError, InvalidRequestError, PendingRollbackError
 from typing import List, Optional, Dict, Any, Tuple
 from app.models.experiment import (
     Experiment, ExperimentRun, ExperimentResult, ExperimentStatus,
-    ExperimentType, RetryMode, CeleryTaskLog
+    ExperimentType, RetryMode, CeleryTaskLog, ExperimentAggregateResult,
+    ExperimentResultExport
 )
 from app.models.dataset import DatasetVersion, DatasetItem
 from app.models.evaluator import EvaluatorVersion
-from app.models.evaluator_record import EvaluatorRecord, EvaluatorRunStatus
+from app.models.evaluator_record import EvaluatorRunStatus
 from app.services.evaluator_service import EvaluatorService
 from app.services.evaluator_record_service import EvaluatorRecordService
 from app.services.dataset_service import DatasetService
@@ -21,19 +22,27 @@ from app.services.observability_service import ObservabilityService
 from app.services.celery_log_service import CeleryLogService
 from app.infra.tracer import get_tracer, DatabaseTracer
 from datetime import datetime
+import asyncio
 import httpx
 import json
-import copy
 import logging
+import re
 from app.domain.entity.evaluator_entity import EvaluatorInputData, Content
-from app.domain.entity.evaluator_types import ContentType
+from app.domain.entity.evaluator_types import ContentType, LanguageType
 from app.models.evaluator import EvaluatorType
 from app.models.experiment import CeleryTaskLogLevel
 from app.utils.logger_utils import log_celery_task_event
+from app.core.config import settings
+from app.core.database import SessionLocal
 
 logger = logging.getLogger(__name__)
 
 
+def _should_verify_spans() -> bool:
+    """Whether to re-read saved spans from the database for debugging"""
+    return settings.VERIFY_SPANS and logger.isEnabledFor(logging.DEBUG)
+
+
 def _pydantic_to_dict(obj):
     """Convert Pydantic model to dict, compatible with both v1 and v2"""
     if hasattr(obj, 'model_dump'):
@@ -83,6 +92,13 @@ def _extract_actual_output(target_fields: Dict[str, Content], target_error: Opti
     return str(content) or ""
 
 
+def _fields_to_log_dict(fields: Optional[Dict[str, Content]]) -> Dict[str, Dict[str, Any]]:
+    """Serialize a name -> Content mapping for span/celery log payloads"""
+    if not fields:
+        return {}
+    return {k: v.to_log_dict() for k, v in fields.items()}
+
+
 def _create_experiment_result(
     experiment_id: int,
     run_id: int,
@@ -111,6 +127,9 @@ def _create_experiment_result(
 
 
 class ExperimentService:
+    # Attempts to find a free generated name when cloning races with another clone
+    CLONE_NAME_MAX_ATTEMPTS = 3
+    
     def __init__(self, db: Session):
         self.db = db
         self.evaluator_service = EvaluatorService(db)
@@ -378,7 +397,8 @@ class ExperimentService:
         logger.info(f"[FieldExtraction] data_content type: {type(data_content)}")
         if isinstance(data_content, dict):
             logger.info(f"[FieldExtraction] data_content keys: {list(data_content.keys())}")
-            logger.info(f"[FieldExtraction] data_content full content: {json.dumps(data_content, ensure_ascii=False, default=str)[:500]}")
+            if logger.isEnabledFor(logging.INFO):
+                logger.info(f"[FieldExtraction] data_content full content: {json.dumps(data_content, ensure_ascii=False, default=str)[:500]}")
         else:
             logger.warning(f"[FieldExtraction] data_content is not a dict: {type(data_content)}")
         
@@ -438,7 +458,8 @@ class ExperimentService:
         logger.info(f"[FieldExtraction] field_data_list type: {type(field_data_list)}, is_list: {isinstance(field_data_list, list) if field_data_list else False}")
         if field_data_list and isinstance(field_data_list, list):
             logger.info(f"[FieldExtraction] field_data_list length: {len(field_data_list)}")
-            logger.info(f"[FieldExtraction] field_data_list content: {json.dumps(field_data_list, ensure_ascii=False, default=str)[:500]}")
+            if logger.isEnabledFor(logging.INFO):
+                logger.info(f"[FieldExtraction] field_data_list content: {json.dumps(field_data_list, ensure_ascii=False, default=str)[:500]}")
         if not isinstance(field_data_list, list):
             # If field_data_list is missing or not a list, return empty dict (consistent with coze-loop)
             logger.warning(f"[FieldExtraction] field_data_list is missing or not a list (type: {type(field_data_list)}), returning empty dict")
@@ -657,7 +678,7 @@ class ExperimentService:
         
         logger.info(f"[BuildInputData] Successfully built input_data for {evaluator_type} evaluator")
         # Log final input_data structure
-        if hasattr(input_data, 'dict'):
+        if logger.isEnabledFor(logging.INFO) and hasattr(input_data, 'dict'):
             input_data_dict = input_data.dict()
             logger.info(f"[BuildInputData] Final input_data structure: {json.dumps(input_data_dict, ensure_ascii=False, default=str)[:1000]}")
         logger.info(f"[BuildInputData] ========== Input data building completed ==========")
@@ -704,11 +725,11 @@ class ExperimentService:
                 "target_type": experiment.evaluation_target_config.get("type") if experiment.evaluation_target_config else "none",
             }
         )
-        logger.info(f"[CallTarget] ✅ Target span created: span_id={target_span.span_id}, name={target_span.name}")
+        logger.info("[CallTarget] ✅ Target span created: span_id=%s, name=%s", target_span.span_id, target_span.name)
         # Set detailed input information
         target_span.set_input({
             "target_config": experiment.evaluation_target_config,
-            "turn_fields": {k: {"text": v.text if hasattr(v, 'text') else str(v), "content_type": v.content_type.value if hasattr(v, 'content_type') else None} for k, v in turn_fields.items()} if turn_fields else {},
+            "turn_fields": _fields_to_log_dict(turn_fields),
             "data_content": item.data_content,
         })
         
@@ -805,7 +826,8 @@ class ExperimentService:
                         value_type = type(value).__name__
                         value_preview = str(value)[:100] if value else "None"
                         logger.debug(f"[CallTarget] input_data['{key}']: type={value_type}, value={value_preview}...")
-                logger.debug(f"[CallTarget] input_data content (first 500 chars): {json.dumps(input_data, ensure_ascii=False, default=str)[:500]}")
+                if logger.isEnabledFor(logging.DEBUG):
+                    logger.debug(f"[CallTarget] input_data content (first 500 chars): {json.dumps(input_data, ensure_ascii=False, default=str)[:500]}")
                 
                 actual_output = await self._invoke_evaluation_target(
                     experiment.evaluation_target_config,
@@ -858,7 +880,7 @@ class ExperimentService:
             # Set detailed output information
             target_span.set_output({
                 "actual_output": str(actual_output),
-                "target_fields": {k: {"text": v.text if hasattr(v, 'text') else str(v), "content_type": v.content_type.value if hasattr(v, 'content_type') else None} for k, v in target_fields.items()} if target_fields else {},
+                "target_fields": _fields_to_log_dict(target_fields),
             })
             
             logger.info(f"[CallTarget] ========== Target call completed ==========")
@@ -982,490 +1004,559 @@ class ExperimentService:
             logger.info(f"[CallEvaluators] Created {len(evaluator_results)} failure results due to target failure")
             return evaluator_results
         
-        # Run all evaluators
-        for evaluator_version_id in experiment.evaluator_version_ids:
-            logger.info(f"[CallEvaluators] Processing evaluator {evaluator_version_id}")
+        # Run all evaluators concurrently; each evaluator is independent and
+        # _run_single_evaluator records its own failures, so one failing
+        # evaluator does not fail the whole item
+        semaphore = asyncio.Semaphore(max(1, settings.EVALUATOR_CONCUR_NUM))
+        evaluator_version_ids = list(experiment.evaluator_version_ids)
+        
+        async def run_with_limit(evaluator_version_id: int) -> Dict[str, Any]:
+            async with semaphore:
+                run_kwargs = dict(
+                    experiment=experiment,
+                    item=item,
+                    evaluator_version_id=evaluator_version_id,
+                    turn_fields=turn_fields,
+                    target_fields=target_fields,
+                    target_error=target_error,
+                    trace_id=trace_id,
+                    root_span_id=root_span_id,
+                    run_id=run_id,
+                    experiment_id=experiment_id,
+                    task_id=task_id,
+                )
+                if len(evaluator_version_ids) == 1:
+                    return await self._run_single_evaluator(**run_kwargs)
+                
+                # Records, logs and spans are committed as each evaluator goes, so
+                # concurrent evaluators each get their own session; on a shared one a
+                # commit or rollback would take in another evaluator's pending state
+                evaluator_db = SessionLocal()
+                try:
+                    return await ExperimentService(evaluator_db)._run_single_evaluator(**run_kwargs)
+                finally:
+                    evaluator_db.close()
+        
+        outcomes = await asyncio.gather(
+            *(run_with_limit(evaluator_version_id) for evaluator_version_id in evaluator_version_ids),
+            return_exceptions=True,
+        )
+        if len(evaluator_version_ids) > 1:
+            # End this session's read snapshot so it sees what the evaluator sessions committed
+            self._safe_commit(raise_on_error=False)
+        for evaluator_version_id, outcome in zip(evaluator_version_ids, outcomes):
+            if isinstance(outcome, BaseException):
+                logger.error(f"[CallEvaluators] Unhandled error in evaluator {evaluator_version_id} for item {item.id}: {str(outcome)}")
+                outcome = {
+                    "score": None,
+                    "reason": str(outcome),
+                    "error_message": str(outcome),
+                }
+            evaluator_results[evaluator_version_id] = outcome
+        
+        logger.info(f"[CallEvaluators] Completed processing {len(evaluator_results)} evaluators")
+        return evaluator_results
+
+    async def _run_single_evaluator(
+        self,
+        experiment,
+        item,
+        evaluator_version_id: int,
+        turn_fields: Dict[str, Content],
+        target_fields: Dict[str, Content],
+        target_error: Optional[str],
+        trace_id: str,
+        root_span_id: str,
+        run_id: int,
+        experiment_id: int,
+        task_id: str,
+    ) -> Dict[str, Any]:
+        """
+        Run one evaluator for the item and persist its ExperimentResult.
+        
+        Errors are recorded as a failed result instead of being raised, so
+        evaluators of the same item can run concurrently and independently.
+        
+        Returns:
+            Dict with score, reason and error_message
+        """
+        logger.info(f"[CallEvaluators] Processing evaluator {evaluator_version_id}")
+        
+        # Log evaluator start
+        self.celery_log_service.create_log(
+            experiment_id, run_id, task_id, CeleryTaskLogLevel.INFO,
+            f"处理评估器 {evaluator_version_id}",
+            "evaluator_start"
+        )
+        # Create span for evaluator execution
+        logger.info(f"[CallEvaluators] 🔵 Creating evaluator span: evaluator_version_id={evaluator_version_id}, trace_id={trace_id}, root_span_id={root_span_id}")
+        evaluator_span = self.tracer.start_span(
+            name=f"evaluator_{evaluator_version_id}",
+            trace_id=trace_id,
+            parent_span_id=root_span_id,
+            kind="INTERNAL",
+            attributes={
+                "evaluator_version_id": evaluator_version_id,
+            }
+        )
+        logger.info("[CallEvaluators] ✅ Evaluator span created: span_id=%s, name=%s", evaluator_span.span_id, evaluator_span.name)
+        
+        try:
+            logger.debug(f"[CallEvaluators] Processing evaluator {evaluator_version_id} for item {item.id}")
+            
+            # Get evaluator type
+            evaluator_version = self.evaluator_service.get_version(evaluator_version_id)
+            if not evaluator_version:
+                logger.error(f"[CallEvaluators] Evaluator version {evaluator_version_id} not found")
+                raise ValueError(f"Evaluator version {evaluator_version_id} not found")
+            
+            evaluator = evaluator_version.evaluator
+            if not evaluator:
+                logger.error(f"[CallEvaluators] Evaluator for version {evaluator_version_id} not found")
+                raise ValueError(f"Evaluator for version {evaluator_version_id} not found")
+            
+            evaluator_type = EvaluatorType(evaluator.evaluator_type)
+            logger.debug(f"[CallEvaluators] Evaluator type: {evaluator_type}")
             
-            # Log evaluator start
+            # Validate input: Check if turn_fields and target_fields are empty
+            if not turn_fields and not target_fields:
+                logger.error(f"[CallEvaluators] Both turn_fields and target_fields are empty for item {item.id}, evaluator {evaluator_version_id}")
+                raise ValueError(f"Cannot evaluate item {item.id}: both turn_fields and target_fields are empty")
+            
+            # Build EvaluatorInputData based on evaluator type (matching coze-loop)
+            input_data = self._build_evaluator_input_data(
+                evaluator_type=evaluator_type,
+                turn_fields=turn_fields,
+                target_fields=target_fields,
+            )
+            
+            # Record evaluator input data
+            input_data_dict = _pydantic_to_dict(input_data)
+            evaluator_name = evaluator.name if evaluator else f"评估器 {evaluator_version_id}"
+            evaluator_type_display = "代码评估器" if evaluator_type == EvaluatorType.CODE else "提示词评估器"
             self.celery_log_service.create_log(
                 experiment_id, run_id, task_id, CeleryTaskLogLevel.INFO,
-                f"处理评估器 {evaluator_version_id}",
-                "evaluator_start"
-            )
-            # Create span for evaluator execution
-            logger.info(f"[CallEvaluators] 🔵 Creating evaluator span: evaluator_version_id={evaluator_version_id}, trace_id={trace_id}, root_span_id={root_span_id}")
-            evaluator_span = self.tracer.start_span(
-                name=f"evaluator_{evaluator_version_id}",
-                trace_id=trace_id,
-                parent_span_id=root_span_id,
-                kind="INTERNAL",
-                attributes={
+                f"构建评估器输入数据 ({evaluator_name}, {evaluator_type_display})",
+                "evaluator_input_built",
+                input_data={
                     "evaluator_version_id": evaluator_version_id,
+                    "evaluator_type": evaluator_type.value,
+                    "evaluator_name": evaluator.name if evaluator else None,
+                    "turn_fields": _fields_to_log_dict(turn_fields),
+                    "target_fields": _fields_to_log_dict(target_fields),
+                    "input_data": input_data_dict,
                 }
             )
-            logger.info(f"[CallEvaluators] ✅ Evaluator span created: span_id={evaluator_span.span_id}, name={evaluator_span.name}")
             
-            try:
-                logger.debug(f"[CallEvaluators] Processing evaluator {evaluator_version_id} for item {item.id}")
+            # Validate input_data based on evaluator type
+            final_code = None
+            if evaluator_type == EvaluatorType.CODE:
+                if not input_data.evaluate_dataset_fields and not input_data.evaluate_target_output_fields:
+                    logger.error(f"[CallEvaluators] Code evaluator {evaluator_version_id}: Both evaluate_dataset_fields and evaluate_target_output_fields are empty!")
+                    raise ValueError(f"Code evaluator {evaluator_version_id} requires at least one of evaluate_dataset_fields or evaluate_target_output_fields")
                 
-                # Get evaluator type
-                evaluator_version = self.evaluator_service.get_version(evaluator_version_id)
-                if not evaluator_version:
-                    logger.error(f"[CallEvaluators] Evaluator version {evaluator_version_id} not found")
-                    raise ValueError(f"Evaluator version {evaluator_version_id} not found")
+                # Build final code (with variables replaced) for logging
+                code_content = evaluator_version.code_content or {}
+                code = code_content.get("code_content", "")
+                language_type_str = code_content.get("language_type", "Python")
+                language_type = LanguageType(language_type_str)
                 
-                evaluator = evaluator_version.evaluator
-                if not evaluator:
-                    logger.error(f"[CallEvaluators] Evaluator for version {evaluator_version_id} not found")
-                    raise ValueError(f"Evaluator for version {evaluator_version_id} not found")
-                
-                evaluator_type = EvaluatorType(evaluator.evaluator_type)
-                logger.debug(f"[CallEvaluators] Evaluator type: {evaluator_type}")
-                
-                # Validate input: Check if turn_fields and target_fields are empty
-                if not turn_fields and not target_fields:
-                    logger.error(f"[CallEvaluators] Both turn_fields and target_fields are empty for item {item.id}, evaluator {evaluator_version_id}")
-                    raise ValueError(f"Cannot evaluate item {item.id}: both turn_fields and target_fields are empty")
-                
-                # Build EvaluatorInputData based on evaluator type (matching coze-loop)
-                input_data = self._build_evaluator_input_data(
-                    evaluator_type=evaluator_type,
-                    turn_fields=turn_fields,
-                    target_fields=target_fields,
-                )
+                # Build code using the same method as evaluator_service
+                final_code = self.evaluator_service.code_builder.build_code(input_data, code, language_type)
                 
-                # Record evaluator input data
-                input_data_dict = _pydantic_to_dict(input_data)
-                evaluator_name = evaluator.name if evaluator else f"评估器 {evaluator_version_id}"
-                evaluator_type_display = "代码评估器" if evaluator_type == EvaluatorType.CODE else "提示词评估器"
+                # Log final code
                 self.celery_log_service.create_log(
                     experiment_id, run_id, task_id, CeleryTaskLogLevel.INFO,
-                    f"构建评估器输入数据 ({evaluator_name}, {evaluator_type_display})",
-                    "evaluator_input_built",
+                    f"评估器完整代码 ({evaluator_name})",
+                    "evaluator_final_code",
                     input_data={
                         "evaluator_version_id": evaluator_version_id,
-                        "evaluator_type": evaluator_type.value,
                         "evaluator_name": evaluator.name if evaluator else None,
-                        "turn_fields": {k: {"text": v.text if hasattr(v, 'text') else str(v)} for k, v in turn_fields.items()} if turn_fields else {},
-                        "target_fields": {k: {"text": v.text if hasattr(v, 'text') else str(v)} for k, v in target_fields.items()} if target_fields else {},
-                        "input_data": input_data_dict,
+                        "language_type": language_type_str,
+                        "original_code": code,
+                        "final_code": final_code,
                     }
                 )
-                
-                # Validate input_data based on evaluator type
-                final_code = None
-                if evaluator_type == EvaluatorType.CODE:
-                    if not input_data.evaluate_dataset_fields and not input_data.evaluate_target_output_fields:
-                        logger.error(f"[CallEvaluators] Code evaluator {evaluator_version_id}: Both evaluate_dataset_fields and evaluate_target_output_fields are empty!")
-                        raise ValueError(f"Code evaluator {evaluator_version_id} requires at least one of evaluate_dataset_fields or evaluate_target_output_fields")
-                    
-                    # Build final code (with variables replaced) for logging
-                    code_content = evaluator_version.code_content or {}
-                    code = code_content.get("code_content", "")
-                    language_type_str = code_content.get("language_type", "Python")
-                    from app.domain.entity.evaluator_types import LanguageType
-                    language_type = LanguageType(language_type_str)
-                    
-                    # Build code using the same method as evaluator_service
-                    final_code = self.evaluator_service.code_builder.build_code(input_data, code, language_type)
-                    
-                    # Log final code
-                    self.celery_log_service.create_log(
-                        experiment_id, run_id, task_id, CeleryTaskLogLevel.INFO,
-                        f"评估器完整代码 ({evaluator_name})",
-                        "evaluator_final_code",
-                        input_data={
-                            "evaluator_version_id": evaluator_version_id,
-                            "evaluator_name": evaluator.name if evaluator else None,
-                            "language_type": language_type_str,
-                            "original_code": code,
-                            "final_code": final_code,
-                        }
-                    )
-                else:
-                    if not input_data.input_fields:
-                        logger.error(f"[CallEvaluators] Prompt evaluator {evaluator_version_id}: input_fields is empty!")
-                        raise ValueError(f"Prompt evaluator {evaluator_version_id} requires input_fields")
-                
-                # Strict validation: Ensure turns is NEVER in evaluate_dataset_fields
-                if input_data.evaluate_dataset_fields and "turns" in input_data.evaluate_dataset_fields:
-                    logger.error(f"[CallEvaluators] CRITICAL: turns field found in evaluate_dataset_fields for item {item.id}, evaluator {evaluator_version_id}")
-                    raise RuntimeError(
-                        f"CRITICAL: turns field found in evaluate_dataset_fields for item {item.id}. "
-                        f"This indicates a bug in field extraction. "
-                        f"Fields: {list(input_data.evaluate_dataset_fields.keys())}"
-                    )
-                            
-                # Final validation before passing to evaluator: Ensure turns is NEVER in any field
-                # This is a critical check - if turns is found, it means there's a bug
-                assert "turns" not in (input_data.evaluate_dataset_fields or {}), (
-                    f"CRITICAL: turns field found in evaluate_dataset_fields for item {item.id}, evaluator {evaluator_version_id}"
-                )
-                assert "turns" not in (input_data.evaluate_target_output_fields or {}), (
-                    f"CRITICAL: turns field found in evaluate_target_output_fields for item {item.id}, evaluator {evaluator_version_id}"
-                )
-                assert "turns" not in (input_data.input_fields or {}), (
-                    f"CRITICAL: turns field found in input_fields for item {item.id}, evaluator {evaluator_version_id}"
+            else:
+                if not input_data.input_fields:
+                    logger.error(f"[CallEvaluators] Prompt evaluator {evaluator_version_id}: input_fields is empty!")
+                    raise ValueError(f"Prompt evaluator {evaluator_version_id} requires input_fields")
+            
+            # Strict validation: Ensure turns is NEVER in evaluate_dataset_fields
+            if input_data.evaluate_dataset_fields and "turns" in input_data.evaluate_dataset_fields:
+                logger.error(f"[CallEvaluators] CRITICAL: turns field found in evaluate_dataset_fields for item {item.id}, evaluator {evaluator_version_id}")
+                raise RuntimeError(
+                    f"CRITICAL: turns field found in evaluate_dataset_fields for item {item.id}. "
+                    f"This indicates a bug in field extraction. "
+                    f"Fields: {list(input_data.evaluate_dataset_fields.keys())}"
                 )
+                        
+            # Final validation before passing to evaluator: Ensure turns is NEVER in any field
+            # This is a critical check - if turns is found, it means there's a bug
+            assert "turns" not in (input_data.evaluate_dataset_fields or {}), (
+                f"CRITICAL: turns field found in evaluate_dataset_fields for item {item.id}, evaluator {evaluator_version_id}"
+            )
+            assert "turns" not in (input_data.evaluate_target_output_fields or {}), (
+                f"CRITICAL: turns field found in evaluate_target_output_fields for item {item.id}, evaluator {evaluator_version_id}"
+            )
+            assert "turns" not in (input_data.input_fields or {}), (
+                f"CRITICAL: turns field found in input_fields for item {item.id}, evaluator {evaluator_version_id}"
+            )
+            
+            logger.info(f"[CallEvaluators] Input data validated for evaluator {evaluator_version_id}, item {item.id}")
+            
+            # Record prompt information for LLM evaluators
+            final_messages = None
+            if evaluator_type == EvaluatorType.PROMPT:
+                prompt_content = evaluator_version.prompt_content or {}
+                message_list = prompt_content.get("message_list", [])
+                model_config = prompt_content.get("model_config", {})
+                parse_type = prompt_content.get("parse_type", "text")
+                prompt_suffix = prompt_content.get("prompt_suffix", "")
                 
-                logger.info(f"[CallEvaluators] Input data validated for evaluator {evaluator_version_id}, item {item.id}")
+                # Build final messages (with variables replaced) for logging
+                final_messages = self.evaluator_service.prompt_service._build_messages(message_list, input_data, prompt_suffix)
                 
-                # Record prompt information for LLM evaluators
-                final_messages = None
-                if evaluator_type == EvaluatorType.PROMPT:
-                    prompt_content = evaluator_version.prompt_content or {}
-                    message_list = prompt_content.get("message_list", [])
-                    model_config = prompt_content.get("model_config", {})
-                    parse_type = prompt_content.get("parse_type", "text")
-                    prompt_suffix = prompt_content.get("prompt_suffix", "")
-                    
-                    # Build final messages (with variables replaced) for logging
-                    from app.services.prompt_evaluator_service import PromptEvaluatorService
-                    prompt_service = PromptEvaluatorService(self.db)
-                    final_messages = prompt_service._build_messages(message_list, input_data, prompt_suffix)
-                    
-                    # Convert messages to dict format for logging
-                    final_messages_dict = [
-                        {
-                            "role": msg.role.value if hasattr(msg.role, 'value') else str(msg.role),
-                            "content": msg.content.text if hasattr(msg.content, 'text') else str(msg.content)
-                        }
-                        for msg in final_messages
-                    ]
-                    
-                    # Update evaluator_input_built log with final messages
-                    # We need to update the previous log entry, but since we can't modify it,
-                    # we'll add a new log entry with the final prompt
-                    self.celery_log_service.create_log(
-                        experiment_id, run_id, task_id, CeleryTaskLogLevel.INFO,
-                        f"评估器完整Prompt ({evaluator_name})",
-                        "evaluator_final_prompt",
-                        input_data={
-                            "evaluator_version_id": evaluator_version_id,
-                            "evaluator_name": evaluator.name if evaluator else None,
-                            "message_list_template": message_list,
-                            "prompt_suffix": prompt_suffix,
-                            "final_messages": final_messages_dict,
-                        }
-                    )
-                    
-                    # Record prompt information to span attributes
-                    evaluator_span.set_attribute("llm.prompt.message_list", message_list)
-                    evaluator_span.set_attribute("llm.prompt.model_config", {
-                        "provider": model_config.get("provider"),
-                        "model": model_config.get("model") or model_config.get("model_version"),
-                        "temperature": model_config.get("temperature"),
-                        "max_tokens": model_config.get("max_tokens"),
-                        "model_config_id": model_config.get("model_config_id"),
-                    })
-                    evaluator_span.set_attribute("llm.prompt.parse_type", parse_type)
-                    if prompt_suffix:
-                        evaluator_span.set_attribute("llm.prompt.prompt_suffix", prompt_suffix)
+                # Convert messages to dict format for logging
+                final_messages_dict = [
+                    {
+                        "role": msg.role.value if hasattr(msg.role, 'value') else str(msg.role),
+                        "content": msg.content.text if hasattr(msg.content, 'text') else str(msg.content)
+                    }
+                    for msg in final_messages
+                ]
                 
-                # Set detailed span input
-                input_data_dict = _pydantic_to_dict(input_data)
-                evaluator_span.set_input({
-                    "evaluator_version_id": evaluator_version_id,
-                    "evaluator_type": evaluator_type.value,
-                    "evaluator_name": evaluator.name if evaluator else None,
-                    "input_data": input_data_dict,
-                    "turn_fields_keys": list(turn_fields.keys()) if turn_fields else [],
-                    "target_fields_keys": list(target_fields.keys()) if target_fields else [],
-                })
-                # Add event for input data preparation
-                evaluator_span.add_event("input_data_prepared", attributes={
-                    "evaluator_type": evaluator_type.value,
-                    "has_dataset_fields": bool(input_data.evaluate_dataset_fields),
-                    "has_target_fields": bool(input_data.evaluate_target_output_fields),
-                    "has_input_fields": bool(input_data.input_fields),
+                # Update evaluator_input_built log with final messages
+                # We need to update the previous log entry, but since we can't modify it,
+                # we'll add a new log entry with the final prompt
+                self.celery_log_service.create_log(
+                    experiment_id, run_id, task_id, CeleryTaskLogLevel.INFO,
+                    f"评估器完整Prompt ({evaluator_name})",
+                    "evaluator_final_prompt",
+                    input_data={
+                        "evaluator_version_id": evaluator_version_id,
+                        "evaluator_name": evaluator.name if evaluator else None,
+                        "message_list_template": message_list,
+                        "prompt_suffix": prompt_suffix,
+                        "final_messages": final_messages_dict,
+                    }
+                )
+                
+                # Record prompt information to span attributes
+                evaluator_span.set_attribute("llm.prompt.message_list", message_list)
+                evaluator_span.set_attribute("llm.prompt.model_config", {
+                    "provider": model_config.get("provider"),
+                    "model": model_config.get("model") or model_config.get("model_version"),
+                    "temperature": model_config.get("temperature"),
+                    "max_tokens": model_config.get("max_tokens"),
+                    "model_config_id": model_config.get("model_config_id"),
                 })
+                evaluator_span.set_attribute("llm.prompt.parse_type", parse_type)
+                if prompt_suffix:
+                    evaluator_span.set_attribute("llm.prompt.prompt_suffix", prompt_suffix)
+            
+            # Set detailed span input
+            input_data_dict = _pydantic_to_dict(input_data)
+            evaluator_span.set_input({
+                "evaluator_version_id": evaluator_version_id,
+                "evaluator_type": evaluator_type.value,
+                "evaluator_name": evaluator.name if evaluator else None,
+                "input_data": input_data_dict,
+                "turn_fields_keys": list(turn_fields.keys()) if turn_fields else [],
+                "target_fields_keys": list(target_fields.keys()) if target_fields else [],
+            })
+            # Add event for input data preparation
+            evaluator_span.add_event("input_data_prepared", attributes={
+                "evaluator_type": evaluator_type.value,
+                "has_dataset_fields": bool(input_data.evaluate_dataset_fields),
+                "has_target_fields": bool(input_data.evaluate_target_output_fields),
+                "has_input_fields": bool(input_data.input_fields),
+            })
+            
+            # Run evaluator
+            logger.debug(f"[CallEvaluators] Running evaluator {evaluator_version_id} for item {item.id}")
+            eval_result = await self.evaluator_service.run_evaluator(
+                version_id=evaluator_version_id,
+                input_data=input_data,
+                experiment_id=experiment_id,
+                experiment_run_id=run_id,
+                dataset_item_id=item.id,
+            )
+            logger.debug(f"[CallEvaluators] Evaluator {evaluator_version_id} execution completed for item {item.id}")
+            
+            # Create evaluator record
+            try:
+                status = EvaluatorRunStatus.SUCCESS if eval_result.evaluator_result else EvaluatorRunStatus.FAIL
+                input_data_dict = _pydantic_to_dict(input_data)
+                output_data_dict = _pydantic_to_dict(eval_result)
                 
-                # Run evaluator
-                logger.debug(f"[CallEvaluators] Running evaluator {evaluator_version_id} for item {item.id}")
-                eval_result = await self.evaluator_service.run_evaluator(
-                    version_id=evaluator_version_id,
-                    input_data=input_data,
+                # Log evaluator_usage before saving
+                evaluator_usage = output_data_dict.get("evaluator_usage")
+                logger.info(f"[CallEvaluators] Creating evaluator record for evaluator {evaluator_version_id}, item {item.id}")
+                logger.info(f"[CallEvaluators] evaluator_usage: {evaluator_usage}")
+                if evaluator_usage:
+                    logger.info(f"[CallEvaluators] input_tokens: {evaluator_usage.get('input_tokens')}, output_tokens: {evaluator_usage.get('output_tokens')}")
+                
+                self.evaluator_record_service.create_record(
+                    evaluator_version_id=evaluator_version_id,
+                    input_data=input_data_dict,
+                    output_data=output_data_dict,
+                    status=status,
                     experiment_id=experiment_id,
                     experiment_run_id=run_id,
                     dataset_item_id=item.id,
+                    trace_id=trace_id,
                 )
-                logger.debug(f"[CallEvaluators] Evaluator {evaluator_version_id} execution completed for item {item.id}")
-                
-                # Create evaluator record
-                try:
-                    status = EvaluatorRunStatus.SUCCESS if eval_result.evaluator_result else EvaluatorRunStatus.FAIL
-                    input_data_dict = _pydantic_to_dict(input_data)
-                    output_data_dict = _pydantic_to_dict(eval_result)
-                    
-                    # Log evaluator_usage before saving
-                    evaluator_usage = output_data_dict.get("evaluator_usage")
-                    logger.info(f"[CallEvaluators] Creating evaluator record for evaluator {evaluator_version_id}, item {item.id}")
-                    logger.info(f"[CallEvaluators] evaluator_usage: {evaluator_usage}")
-                    if evaluator_usage:
-                        logger.info(f"[CallEvaluators] input_tokens: {evaluator_usage.get('input_tokens')}, output_tokens: {evaluator_usage.get('output_tokens')}")
-                    
-                    self.evaluator_record_service.create_record(
-                        evaluator_version_id=evaluator_version_id,
-                        input_data=input_data_dict,
-                        output_data=output_data_dict,
-                        status=status,
-                        experiment_id=experiment_id,
-                        experiment_run_id=run_id,
-                        dataset_item_id=item.id,
-                        trace_id=trace_id,
-                    )
-                    logger.info(f"[CallEvaluators] ✅ Evaluator record created successfully for evaluator {evaluator_version_id}, item {item.id}")
-                except Exception as e:
-                    logger.error(f"[CallEvaluators] ❌ Failed to create evaluator record for evaluator {evaluator_version_id}, item {item.id}: {str(e)}", exc_info=True)
-                
-                # Extract result from EvaluatorOutputData
-                score = None
-                reason = None
-                error_message = None
-                
-                # Add debug info
-                debug_info = {
-                    "evaluator_version_id": evaluator_version_id,
-                    "eval_result_type": str(type(eval_result)),
-                    "has_evaluator_result": eval_result.evaluator_result is not None,
-                    "has_evaluator_run_error": eval_result.evaluator_run_error is not None,
-                }
-                if hasattr(eval_result, 'dict'):
-                    debug_info["eval_result"] = eval_result.dict()
-                else:
-                    debug_info["eval_result"] = str(eval_result)
+                logger.info(f"[CallEvaluators] ✅ Evaluator record created successfully for evaluator {evaluator_version_id}, item {item.id}")
+            except Exception as e:
+                logger.error(f"[CallEvaluators] ❌ Failed to create evaluator record for evaluator {evaluator_version_id}, item {item.id}: {str(e)}", exc_info=True)
+            
+            # Extract result from EvaluatorOutputData
+            score = None
+            reason = None
+            error_message = None
+            
+            # Add debug info
+            debug_info = {
+                "evaluator_version_id": evaluator_version_id,
+                "eval_result_type": str(type(eval_result)),
+                "has_evaluator_result": eval_result.evaluator_result is not None,
+                "has_evaluator_run_error": eval_result.evaluator_run_error is not None,
+            }
+            if hasattr(eval_result, 'dict'):
+                debug_info["eval_result"] = eval_result.dict()
+            else:
+                debug_info["eval_result"] = str(eval_result)
+            
+            logger.info(f"[CallEvaluators] Evaluator {evaluator_version_id} result debug info:")
+            logger.info(f"[CallEvaluators]   - has_evaluator_result: {debug_info.get('has_evaluator_result')}")
+            logger.info(f"[CallEvaluators]   - has_evaluator_run_error: {debug_info.get('has_evaluator_run_error')}")
+            if logger.isEnabledFor(logging.INFO) and hasattr(eval_result, 'dict'):
+                result_dict = eval_result.dict()
+                logger.info(f"[CallEvaluators]   - Full result: {json.dumps(result_dict, ensure_ascii=False, default=str)[:1000]}")
+            
+            # Initialize variables
+            score = None
+            reason = None
+            error_message = None
+            
+            # Check for evaluator run error first
+            if eval_result.evaluator_run_error:
+                error_message = f"Evaluator execution error: {eval_result.evaluator_run_error.message}"
+                logger.error(f"[CallEvaluators] Evaluator {evaluator_version_id} execution error: {error_message}")
+                reason = error_message
+            elif eval_result.evaluator_result:
+                score = eval_result.evaluator_result.score
+                reason = eval_result.evaluator_result.reasoning
                 
-                logger.info(f"[CallEvaluators] Evaluator {evaluator_version_id} result debug info:")
-                logger.info(f"[CallEvaluators]   - has_evaluator_result: {debug_info.get('has_evaluator_result')}")
-                logger.info(f"[CallEvaluators]   - has_evaluator_run_error: {debug_info.get('has_evaluator_run_error')}")
-                if hasattr(eval_result, 'dict'):
-                    result_dict = eval_result.dict()
-                    logger.info(f"[CallEvaluators]   - Full result: {json.dumps(result_dict, ensure_ascii=False, default=str)[:1000]}")
+                # Recursively parse reason if it's a JSON string to avoid double encoding
+                if reason and isinstance(reason, str):
+                    reason = _parse_json_string_recursive(reason)
                 
-                # Initialize variables
-                score = None
-                reason = None
-                error_message = None
+                logger.info(f"[CallEvaluators] Evaluator {evaluator_version_id} result:")
+                logger.info(f"[CallEvaluators]   - score: {score} (type: {type(score)})")
+                logger.info(f"[CallEvaluators]   - reason: {reason[:200] if reason else 'None'}...")
+                logger.info(f"[CallEvaluators]   - has_reason: {reason is not None}")
                 
-                # Check for evaluator run error first
-                if eval_result.evaluator_run_error:
-                    error_message = f"Evaluator execution error: {eval_result.evaluator_run_error.message}"
-                    logger.error(f"[CallEvaluators] Evaluator {evaluator_version_id} execution error: {error_message}")
-                    reason = error_message
-                elif eval_result.evaluator_result:
-                    score = eval_result.evaluator_result.score
-                    reason = eval_result.evaluator_result.reasoning
-                    
-                    # Recursively parse reason if it's a JSON string to avoid double encoding
-                    if reason and isinstance(reason, str):
-                        reason = _parse_json_string_recursive(reason)
-                    
-                    logger.info(f"[CallEvaluators] Evaluator {evaluator_version_id} result:")
-                    logger.info(f"[CallEvaluators]   - score: {score} (type: {type(score)})")
-                    logger.info(f"[CallEvaluators]   - reason: {reason[:200] if reason else 'None'}...")
-                    logger.info(f"[CallEvaluators]   - has_reason: {reason is not None}")
-                    
-                    # Check if score is None
-                    if score is None:
-                        error_message = "Failed to parse score from evaluator output"
-                        logger.error(f"[CallEvaluators] Evaluator {evaluator_version_id} returned score=None!")
-                        logger.error(f"[CallEvaluators] Reason from evaluator: {reason}")
-                        logger.error(f"[CallEvaluators] Full debug info: {json.dumps(debug_info, default=str, indent=2)}")
-                        # Append debug info to reason
-                        debug_str = json.dumps(debug_info, default=str, indent=2)
-                        if reason:
-                            reason = f"Error: {error_message}\n\nRaw Output: {reason}\n\nDebug Info: {debug_str}"
-                        else:
-                            reason = f"Error: {error_message}\n\nDebug Info: {debug_str}"
-                    else:
-                        logger.info(f"[CallEvaluators] ✅ Evaluator {evaluator_version_id} successfully returned score: {score}")
-                        
-                        # Log evaluator result with detailed output
-                        eval_result_dict = _pydantic_to_dict(eval_result)
-                        # Clean up evaluator_result to avoid double encoding
-                        evaluator_result_clean = eval_result_dict.get("evaluator_result")
-                        if evaluator_result_clean and isinstance(evaluator_result_clean, dict):
-                            # Recursively parse reasoning if it's a JSON string
-                            if "reasoning" in evaluator_result_clean and isinstance(evaluator_result_clean["reasoning"], str):
-                                evaluator_result_clean["reasoning"] = _parse_json_string_recursive(evaluator_result_clean["reasoning"])
-                            # Also check reason field
-                            if "reason" in evaluator_result_clean and isinstance(evaluator_result_clean["reason"], str):
-                                evaluator_result_clean["reason"] = _parse_json_string_recursive(evaluator_result_clean["reason"])
-                        
-                        self.celery_log_service.create_log(
-                            experiment_id, run_id, task_id, CeleryTaskLogLevel.INFO,
-                            f"评估器返回分数: {score}",
-                            "evaluator_result",
-                            output_data={
-                                "score": score,
-                                "reason": reason,
-                                "evaluator_result": evaluator_result_clean,
-                                "evaluator_usage": eval_result_dict.get("evaluator_usage"),
-                                "time_consuming_ms": eval_result_dict.get("time_consuming_ms"),
-                            }
-                        )
-                else:
-                    # No result object at all
-                    error_message = "Evaluator returned no result object"
-                    logger.error(f"[CallEvaluators] ❌ Evaluator {evaluator_version_id} returned no result object!")
+                # Check if score is None
+                if score is None:
+                    error_message = "Failed to parse score from evaluator output"
+                    logger.error(f"[CallEvaluators] Evaluator {evaluator_version_id} returned score=None!")
+                    logger.error(f"[CallEvaluators] Reason from evaluator: {reason}")
                     logger.error(f"[CallEvaluators] Full debug info: {json.dumps(debug_info, default=str, indent=2)}")
-                    logger.error(f"[CallEvaluators] eval_result type: {type(eval_result)}")
-                    logger.error(f"[CallEvaluators] eval_result attributes: {dir(eval_result)}")
+                    # Append debug info to reason
                     debug_str = json.dumps(debug_info, default=str, indent=2)
-                    reason = f"Error: {error_message}\n\nDebug Info: {debug_str}"
-                
-                # Record LLM response information for prompt evaluators
-                if evaluator_type == EvaluatorType.PROMPT and eval_result:
-                    eval_result_dict = _pydantic_to_dict(eval_result)
-                    
-                    # Record response content
-                    if eval_result.evaluator_result:
-                        evaluator_span.set_attribute("llm.response.score", eval_result.evaluator_result.score)
-                        evaluator_span.set_attribute("llm.response.reasoning", eval_result.evaluator_result.reasoning)
-                    
-                    # Record token usage
-                    evaluator_usage = eval_result_dict.get("evaluator_usage", {})
-                    if evaluator_usage:
-                        evaluator_span.set_attribute("llm.usage.input_tokens", evaluator_usage.get("input_tokens", 0))
-                        evaluator_span.set_attribute("llm.usage.output_tokens", evaluator_usage.get("output_tokens", 0))
+                    if reason:
+                        reason = f"Error: {error_message}\n\nRaw Output: {reason}\n\nDebug Info: {debug_str}"
+                    else:
+                        reason = f"Error: {error_message}\n\nDebug Info: {debug_str}"
+                else:
+                    logger.info(f"[CallEvaluators] ✅ Evaluator {evaluator_version_id} successfully returned score: {score}")
                     
-                    # Record time consuming
-                    if eval_result.time_consuming_ms:
-                        evaluator_span.set_attribute("llm.time_consuming_ms", eval_result.time_consuming_ms)
+                    # Log evaluator result with detailed output
+                    eval_result_dict = _pydantic_to_dict(eval_result)
+                    # Clean up evaluator_result to avoid double encoding
+                    evaluator_result_clean = eval_result_dict.get("evaluator_result")
+                    if evaluator_result_clean and isinstance(evaluator_result_clean, dict):
+                        # Recursively parse reasoning if it's a JSON string
+                        if "reasoning" in evaluator_result_clean and isinstance(evaluator_result_clean["reasoning"], str):
+                            evaluator_result_clean["reasoning"] = _parse_json_string_recursive(evaluator_result_clean["reasoning"])
+                        # Also check reason field
+                        if "reason" in evaluator_result_clean and isinstance(evaluator_result_clean["reason"], str):
+                            evaluator_result_clean["reason"] = _parse_json_string_recursive(evaluator_result_clean["reason"])
                     
-                    # Record error if any
-                    if eval_result.evaluator_run_error:
-                        evaluator_span.set_attribute("llm.error.code", eval_result.evaluator_run_error.code)
-                        evaluator_span.set_attribute("llm.error.message", eval_result.evaluator_run_error.message)
-                
-                # Set detailed span output
+                    self.celery_log_service.create_log(
+                        experiment_id, run_id, task_id, CeleryTaskLogLevel.INFO,
+                        f"评估器返回分数: {score}",
+                        "evaluator_result",
+                        output_data={
+                            "score": score,
+                            "reason": reason,
+                            "evaluator_result": evaluator_result_clean,
+                            "evaluator_usage": eval_result_dict.get("evaluator_usage"),
+                            "time_consuming_ms": eval_result_dict.get("time_consuming_ms"),
+                        }
+                    )
+            else:
+                # No result object at all
+                error_message = "Evaluator returned no result object"
+                logger.error(f"[CallEvaluators] ❌ Evaluator {evaluator_version_id} returned no result object!")
+                logger.error(f"[CallEvaluators] Full debug info: {json.dumps(debug_info, default=str, indent=2)}")
+                logger.error(f"[CallEvaluators] eval_result type: {type(eval_result)}")
+                logger.error(f"[CallEvaluators] eval_result attributes: {dir(eval_result)}")
+                debug_str = json.dumps(debug_info, default=str, indent=2)
+                reason = f"Error: {error_message}\n\nDebug Info: {debug_str}"
+            
+            # Record LLM response information for prompt evaluators
+            if evaluator_type == EvaluatorType.PROMPT and eval_result:
                 eval_result_dict = _pydantic_to_dict(eval_result)
-                evaluator_span.set_output({
-                    "score": score,
-                    "reason": reason,
-                    "error": error_message,
-                    "result": eval_result_dict,
-                    "has_error": error_message is not None,
-                    "evaluator_version_id": evaluator_version_id,
-                })
-                # Add event for evaluation completion
-                evaluator_span.add_event("evaluation_completed", attributes={
-                    "score": score,
-                    "has_error": error_message is not None,
-                })
                 
-                actual_output_str = _extract_actual_output(target_fields, target_error)
-                if target_error and not actual_output_str:
-                    logger.warning(f"[CallEvaluators] Target call failed for item {item.id}, saving error to actual_output: {target_error}")
+                # Record response content
+                if eval_result.evaluator_result:
+                    evaluator_span.set_attribute("llm.response.score", eval_result.evaluator_result.score)
+                    evaluator_span.set_attribute("llm.response.reasoning", eval_result.evaluator_result.reasoning)
                 
-                result = _create_experiment_result(
-                    experiment_id=experiment_id,
-                    run_id=run_id,
-                    dataset_item_id=item.id,
-                    evaluator_version_id=evaluator_version_id,
-                    score=score,
-                    reason=reason,
-                    actual_output=actual_output_str,
-                    trace_id=trace_id,
-                    error_message=error_message,
-                    details=eval_result.dict() if hasattr(eval_result, 'dict') else None,
-                )
-                self.db.add(result)
-                self.db.commit()
+                # Record token usage
+                evaluator_usage = eval_result_dict.get("evaluator_usage", {})
+                if evaluator_usage:
+                    evaluator_span.set_attribute("llm.usage.input_tokens", evaluator_usage.get("input_tokens", 0))
+                    evaluator_span.set_attribute("llm.usage.output_tokens", evaluator_usage.get("output_tokens", 0))
                 
-                evaluator_results[evaluator_version_id] = {
+                # Record time consuming
+                if eval_result.time_consuming_ms:
+                    evaluator_span.set_attribute("llm.time_consuming_ms", eval_result.time_consuming_ms)
+                
+                # Record error if any
+                if eval_result.evaluator_run_error:
+                    evaluator_span.set_attribute("llm.error.code", eval_result.evaluator_run_error.code)
+                    evaluator_span.set_attribute("llm.error.message", eval_result.evaluator_run_error.message)
+            
+            # Set detailed span output
+            eval_result_dict = _pydantic_to_dict(eval_result)
+            evaluator_span.set_output({
+                "score": score,
+                "reason": reason,
+                "error": error_message,
+                "result": eval_result_dict,
+                "has_error": error_message is not None,
+                "evaluator_version_id": evaluator_version_id,
+            })
+            # Add event for evaluation completion
+            evaluator_span.add_event("evaluation_completed", attributes={
+                "score": score,
+                "has_error": error_message is not None,
+            })
+            
+            actual_output_str = _extract_actual_output(target_fields, target_error)
+            if target_error and not actual_output_str:
+                logger.warning(f"[CallEvaluators] Target call failed for item {item.id}, saving error to actual_output: {target_error}")
+            
+            result = _create_experiment_result(
+                experiment_id=experiment_id,
+                run_id=run_id,
+                dataset_item_id=item.id,
+                evaluator_version_id=evaluator_version_id,
+                score=score,
+                reason=reason,
+                actual_output=actual_output_str,
+                trace_id=trace_id,
+                error_message=error_message,
+                details=eval_result.dict() if hasattr(eval_result, 'dict') else None,
+            )
+            self.db.add(result)
+            self.db.commit()
+            
+            evaluator_result = {
+                "score": score,
+                "reason": reason,
+                "error_message": error_message,
+            }
+            logger.info(f"[CallEvaluators] ✅ Evaluator {evaluator_version_id} result saved - score: {score}, has_error: {error_message is not None}")
+            logger.info(f"[CallEvaluators] ========== Evaluator {evaluator_version_id} processing completed ==========")
+            
+            # Log evaluator completion with detailed output
+            eval_result_dict = _pydantic_to_dict(eval_result) if hasattr(eval_result, 'dict') else {}
+            # Clean up evaluator_result to avoid double encoding
+            evaluator_result_clean = eval_result_dict.get("evaluator_result")
+            if evaluator_result_clean and isinstance(evaluator_result_clean, dict):
+                # Recursively parse reasoning if it's a JSON string
+                if "reasoning" in evaluator_result_clean and isinstance(evaluator_result_clean["reasoning"], str):
+                    evaluator_result_clean["reasoning"] = _parse_json_string_recursive(evaluator_result_clean["reasoning"])
+                # Also check reason field
+                if "reason" in evaluator_result_clean and isinstance(evaluator_result_clean["reason"], str):
+                    evaluator_result_clean["reason"] = _parse_json_string_recursive(evaluator_result_clean["reason"])
+            
+            self.celery_log_service.create_log(
+                experiment_id, run_id, task_id, CeleryTaskLogLevel.INFO,
+                f"评估器处理完成，分数: {score}" + (f"，错误: {error_message}" if error_message else ""),
+                "evaluator_saved",
+                output_data={
+                    "evaluator_version_id": evaluator_version_id,
                     "score": score,
                     "reason": reason,
                     "error_message": error_message,
+                    "evaluator_result": evaluator_result_clean,
+                    "evaluator_usage": eval_result_dict.get("evaluator_usage"),
+                    "time_consuming_ms": eval_result_dict.get("time_consuming_ms"),
+                    "evaluator_run_error": eval_result_dict.get("evaluator_run_error"),
                 }
-                logger.info(f"[CallEvaluators] ✅ Evaluator {evaluator_version_id} result saved - score: {score}, has_error: {error_message is not None}")
-                logger.info(f"[CallEvaluators] ========== Evaluator {evaluator_version_id} processing completed ==========")
-                
-                # Log evaluator completion with detailed output
-                eval_result_dict = _pydantic_to_dict(eval_result) if hasattr(eval_result, 'dict') else {}
-                # Clean up evaluator_result to avoid double encoding
-                evaluator_result_clean = eval_result_dict.get("evaluator_result")
-                if evaluator_result_clean and isinstance(evaluator_result_clean, dict):
-                    # Recursively parse reasoning if it's a JSON string
-                    if "reasoning" in evaluator_result_clean and isinstance(evaluator_result_clean["reasoning"], str):
-                        evaluator_result_clean["reasoning"] = _parse_json_string_recursive(evaluator_result_clean["reasoning"])
-                    # Also check reason field
-                    if "reason" in evaluator_result_clean and isinstance(evaluator_result_clean["reason"], str):
-                        evaluator_result_clean["reason"] = _parse_json_string_recursive(evaluator_result_clean["reason"])
-                
-                self.celery_log_service.create_log(
-                    experiment_id, run_id, task_id, CeleryTaskLogLevel.INFO,
-                    f"评估器处理完成，分数: {score}" + (f"，错误: {error_message}" if error_message else ""),
-                    "evaluator_saved",
-                    output_data={
-                        "evaluator_version_id": evaluator_version_id,
-                        "score": score,
-                        "reason": reason,
-                        "error_message": error_message,
-                        "evaluator_result": evaluator_result_clean,
-                        "evaluator_usage": eval_result_dict.get("evaluator_usage"),
-                        "time_consuming_ms": eval_result_dict.get("time_consuming_ms"),
-                        "evaluator_run_error": eval_result_dict.get("evaluator_run_error"),
-                    }
-                )
-                
-            except Exception as e:
-                if evaluator_span:
-                    evaluator_span.set_error(e)
-                
-                logger.error(f"[CallEvaluators] Error executing evaluator {evaluator_version_id} for item {item.id}: {str(e)}", exc_info=True)
-                
-                # Log evaluator error
-                self.celery_log_service.create_log(
-                    experiment_id, run_id, task_id, CeleryTaskLogLevel.ERROR,
-                    f"评估器执行失败: {str(e)}",
-                    "evaluator_error"
-                )
-                
-                actual_output_str = _extract_actual_output(target_fields, target_error)
-                if target_error and not actual_output_str:
-                    logger.warning(f"[CallEvaluators] Target call failed for item {item.id}, saving error to actual_output: {target_error}")
-                
-                result = _create_experiment_result(
-                    experiment_id=experiment_id,
-                    run_id=run_id,
-                    dataset_item_id=item.id,
-                    evaluator_version_id=evaluator_version_id,
-                    score=None,
-                    reason=str(e),
-                    actual_output=actual_output_str,
-                    trace_id=trace_id,
-                    error_message=str(e),
-                )
-                self.db.add(result)
-                self.db.commit()
+            )
+            
+        except Exception as e:
+            if evaluator_span:
+                evaluator_span.set_error(e)
+            
+            logger.error(f"[CallEvaluators] Error executing evaluator {evaluator_version_id} for item {item.id}: {str(e)}", exc_info=True)
+            
+            # Log evaluator error
+            self.celery_log_service.create_log(
+                experiment_id, run_id, task_id, CeleryTaskLogLevel.ERROR,
+                f"评估器执行失败: {str(e)}",
+                "evaluator_error"
+            )
+            
+            actual_output_str = _extract_actual_output(target_fields, target_error)
+            if target_error and not actual_output_str:
+                logger.warning(f"[CallEvaluators] Target call failed for item {item.id}, saving error to actual_output: {target_error}")
+            
+            result = _create_experiment_result(
+                experiment_id=experiment_id,
+                run_id=run_id,
+                dataset_item_id=item.id,
+                evaluator_version_id=evaluator_version_id,
+                score=None,
+                reason=str(e),
+                actual_output=actual_output_str,
+                trace_id=trace_id,
+                error_message=str(e),
+            )
+            self.db.add(result)
+            self.db.commit()
+            
+            evaluator_result = {
+                "score": None,
+                "reason": str(e),
+                "error_message": str(e),
+            }
+        finally:
+            # Finish span immediately (auto-saved by DatabaseTracer)
+            # This follows coze-loop's pattern: each span is saved when finished
+            if evaluator_span:
+                logger.info("[CallEvaluators] 🔄 About to finish evaluator span: span_id=%s, evaluator_version_id=%s, trace_id=%s, parent_span_id=%s", evaluator_span.span_id, evaluator_version_id, trace_id, root_span_id)
+                self.tracer.finish_span(evaluator_span, db=self.db)
+                logger.info("[CallEvaluators] ✅ Evaluator span finish_span() called: span_id=%s, evaluator_version_id=%s", evaluator_span.span_id, evaluator_version_id)
                 
-                evaluator_results[evaluator_version_id] = {
-                    "score": None,
-                    "reason": str(e),
-                    "error_message": str(e),
-                }
-            finally:
-                # Finish span immediately (auto-saved by DatabaseTracer)
-                # This follows coze-loop's pattern: each span is saved when finished
-                if evaluator_span:
-                    logger.info(f"[CallEvaluators] 🔄 About to finish evaluator span: span_id={evaluator_span.span_id}, evaluator_version_id={evaluator_version_id}, trace_id={trace_id}, parent_span_id={root_span_id}, has_db={self.db is not None}")
-                    self.tracer.finish_span(evaluator_span, db=self.db)
-                    logger.info(f"[CallEvaluators] ✅ Evaluator span finish_span() called: span_id={evaluator_span.span_id}, evaluator_version_id={evaluator_version_id}")
-                    
-                    # Verify evaluator span was saved
-                    from app.services.observability_service import ObservabilityService
-                    obs_service = ObservabilityService(self.db)
-                    saved_evaluator_span = obs_service.get_span(evaluator_span.span_id)
+                # Verify evaluator span was saved (debug only)
+                if _should_verify_spans():
+                    saved_evaluator_span = self.observability_service.get_span(evaluator_span.span_id)
                     if saved_evaluator_span:
                         logger.info(f"[CallEvaluators] ✅ VERIFIED: Evaluator span {evaluator_span.span_id} (evaluator_version_id={evaluator_version_id}) found in database")
                     else:
                         logger.error(f"[CallEvaluators] ❌ CRITICAL: Evaluator span {evaluator_span.span_id} (evaluator_version_id={evaluator_version_id}) NOT found in database after save!")
-                else:
-                    logger.error(f"[CallEvaluators] ❌ CRITICAL: evaluator_span is None for evaluator_version_id={evaluator_version_id}!")
+            else:
+                logger.error(f"[CallEvaluators] ❌ CRITICAL: evaluator_span is None for evaluator_version_id={evaluator_version_id}!")
         
-        logger.info(f"[CallEvaluators] Completed processing {len(evaluator_results)} evaluators")
-        return evaluator_results
+        return evaluator_result
 
     # Execution
     async def execute_experiment(self, experiment_id: int, run_id: int):
@@ -1597,13 +1688,7 @@ class ExperimentService:
                         logger.info(f"[ExecuteExperiment] Successfully extracted {len(turn_fields)} fields from item {item.id}: {list(turn_fields.keys())}")
                         
                         # Record field extraction with input/output
-                        turn_fields_data = {
-                            k: {
-                                "text": v.text if hasattr(v, 'text') else str(v),
-                                "format": v.format if hasattr(v, 'format') else None,
-                                "content_type": v.content_type.value if hasattr(v, 'content_type') and hasattr(v.content_type, 'value') else None,
-                            } for k, v in turn_fields.items()
-                        }
+                        turn_fields_data = _fields_to_log_dict(turn_fields)
                         
                         self.celery_log_service.create_log(
                             experiment_id, run_id, task_id, CeleryTaskLogLevel.INFO,
@@ -1683,28 +1768,16 @@ class ExperimentService:
                                 "dataset_item_id": item.id,
                                 "target_type": target_type,
                                 "target_config": target_config,
-                                "turn_fields": {k: {"text": v.text if hasattr(v, 'text') else str(v)} for k, v in turn_fields.items()} if turn_fields else {},
+                                "turn_fields": _fields_to_log_dict(turn_fields),
                             },
                             output_data={"error": target_error}
                         )
                     
                     # Record target call with input/output
-                    target_fields_data = {
-                        k: {
-                            "text": v.text if hasattr(v, 'text') else str(v),
-                            "format": v.format if hasattr(v, 'format') else None,
-                            "content_type": v.content_type.value if hasattr(v, 'content_type') and hasattr(v.content_type, 'value') else None,
-                        } for k, v in target_fields.items()
-                    }
+                    target_fields_data = _fields_to_log_dict(target_fields)
                     
                     # Prepare turn_fields data for logging
-                    turn_fields_for_log = {
-                        k: {
-                            "text": v.text if hasattr(v, 'text') else str(v),
-                            "format": v.format if hasattr(v, 'format') else None,
-                            "content_type": v.content_type.value if hasattr(v, 'content_type') and hasattr(v.content_type, 'value') else None,
-                        } for k, v in turn_fields.items()
-                    }
+                    turn_fields_for_log = _fields_to_log_dict(turn_fields)
                     
                     log_level = CeleryTaskLogLevel.ERROR if target_error else CeleryTaskLogLevel.INFO
                     if target_error:
@@ -1727,18 +1800,17 @@ class ExperimentService:
                     
                     # Finish target span immediately (auto-saved by DatabaseTracer)
                     if target_span:
-                        logger.info(f"[ExecuteExperiment] 🔄 About to finish target span: span_id={target_span.span_id}, trace_id={trace_id}, parent_span_id={root_span_id}, has_db={self.db is not None}")
+                        logger.info("[ExecuteExperiment] 🔄 About to finish target span: span_id=%s, trace_id=%s, parent_span_id=%s", target_span.span_id, trace_id, root_span_id)
                         self.tracer.finish_span(target_span, db=self.db)
-                        logger.info(f"[ExecuteExperiment] ✅ Target span finish_span() called: span_id={target_span.span_id}")
+                        logger.info("[ExecuteExperiment] ✅ Target span finish_span() called: span_id=%s", target_span.span_id)
                         
-                        # Verify target span was saved
-                        from app.services.observability_service import ObservabilityService
-                        obs_service = ObservabilityService(self.db)
-                        saved_target_span = obs_service.get_span(target_span.span_id)
-                        if saved_target_span:
-                            logger.info(f"[ExecuteExperiment] ✅ VERIFIED: Target span {target_span.span_id} found in database")
-                        else:
-                            logger.error(f"[ExecuteExperiment] ❌ CRITICAL: Target span {target_span.span_id} NOT found in database after save!")
+                        # Verify target span was saved (debug only)
+                        if _should_verify_spans():
+                            saved_target_span = self.observability_service.get_span(target_span.span_id)
+                            if saved_target_span:
+                                logger.info(f"[ExecuteExperiment] ✅ VERIFIED: Target span {target_span.span_id} found in database")
+                            else:
+                                logger.error(f"[ExecuteExperiment] ❌ CRITICAL: Target span {target_span.span_id} NOT found in database after save!")
                     else:
                         logger.warning(f"[ExecuteExperiment] ⚠️ target_span is None! Cannot finish target span.")
                     
@@ -1776,20 +1848,19 @@ class ExperimentService:
                         "evaluator_completed"
                     )
                     
-                    # Verify all spans were saved to database
-                    from app.services.observability_service import ObservabilityService
-                    obs_service = ObservabilityService(self.db)
-                    all_spans = obs_service.list_spans(trace_id)
-                    logger.info(f"[ExecuteExperiment] 🔍 VERIFICATION: Found {len(all_spans)} spans in database for trace {trace_id}")
-                    for span in all_spans:
-                        logger.info(f"[ExecuteExperiment]   - Span: span_id={span.span_id}, name={span.name}, parent_span_id={span.parent_span_id}")
+                    # Verify all spans were saved to database (debug only)
+                    if _should_verify_spans():
+                        all_spans = self.observability_service.list_spans(trace_id)
+                        logger.info(f"[ExecuteExperiment] 🔍 VERIFICATION: Found {len(all_spans)} spans in database for trace {trace_id}")
+                        for span in all_spans:
+                            logger.info(f"[ExecuteExperiment]   - Span: span_id={span.span_id}, name={span.name}, parent_span_id={span.parent_span_id}")
                     
-                    # Verify we have all expected spans
-                    expected_span_count = 1 + 1 + len(experiment.evaluator_version_ids)  # root + target + evaluators
-                    if len(all_spans) < expected_span_count:
-                        logger.error(f"[ExecuteExperiment] ❌ CRITICAL: Expected {expected_span_count} spans but found {len(all_spans)}! Missing spans!")
-                    else:
-                        logger.info(f"[ExecuteExperiment] ✅ All {expected_span_count} expected spans found in database")
+                        # Verify we have all expected spans
+                        expected_span_count = 1 + 1 + len(experiment.evaluator_version_ids)  # root + target + evaluators
+                        if len(all_spans) < expected_span_count:
+                            logger.error(f"[ExecuteExperiment] ❌ CRITICAL: Expected {expected_span_count} spans but found {len(all_spans)}! Missing spans!")
+                        else:
+                            logger.info(f"[ExecuteExperiment] ✅ All {expected_span_count} expected spans found in database")
                     
                     # Set root span output
                     trace_span.set_output({
@@ -1871,7 +1942,8 @@ class ExperimentService:
         logger.info(f"[InvokeTarget] ========== Invoking evaluation target ==========")
         logger.info(f"[InvokeTarget] Target type: {config.get('type')}")
         logger.info(f"[InvokeTarget] Input data keys: {list(input_data.keys()) if isinstance(input_data, dict) else 'not a dict'}")
-        logger.debug(f"[InvokeTarget] Input data content (first 500 chars): {json.dumps(input_data, ensure_ascii=False, default=str)[:500]}")
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug(f"[InvokeTarget] Input data content (first 500 chars): {json.dumps(input_data, ensure_ascii=False, default=str)[:500]}")
         
         try:
             # Use AutoGenTargetInvoker for unified target invocation
@@ -1907,37 +1979,55 @@ class ExperimentService:
         existing = query.first()
         return existing is None
     
+    def _next_copy_name(self, base_name: str) -> str:
+        """Return the next free "<base_name>_copy_<n>" name using a single query"""
+        prefix = f"{base_name}_copy_"
+        existing_names = self.db.query(Experiment.name).filter(
+            Experiment.name.startswith(prefix, autoescape=True)
+        ).all()
+        
+        copy_pattern = re.compile(rf"{re.escape(prefix)}(\d+)$")
+        counters = [
+            int(match.group(1))
+            for (name,) in existing_names
+            if (match := copy_pattern.match(name))
+        ]
+        return f"{prefix}{max(counters, default=0) + 1}"
+    
     def clone_experiment(self, experiment_id: int, new_name: Optional[str] = None) -> Experiment:
         """Clone an experiment"""
         original = self.get_experiment(experiment_id)
         if not original:
             raise ValueError(f"Experiment {experiment_id} not found")
         
-        # Generate new name if not provided
-        if not new_name:
-            base_name = original.name
-            counter = 1
-            new_name = f"{base_name}_copy_{counter}"
-            while not self.check_experiment_name(new_name):
-                counter += 1
-                new_name = f"{base_name}_copy_{counter}"
-        
-        # Create new experiment
-        new_experiment = Experiment(
-            name=new_name,
-            description=original.description,
-            dataset_version_id=original.dataset_version_id,
-            evaluation_target_config=copy.deepcopy(original.evaluation_target_config),
-            evaluator_version_ids=copy.deepcopy(original.evaluator_version_ids),
-            item_concur_num=original.item_concur_num,
-            expt_type=original.expt_type,
-            max_alive_time=original.max_alive_time,
-            created_by=original.created_by,
-        )
-        self.db.add(new_experiment)
-        self.db.commit()
-        self.db.refresh(new_experiment)
-        return new_experiment
+        # Experiment names are unique in the database. A generated name may still
+        # collide with a concurrent clone, so retry with the next counter in that case.
+        auto_name = not new_name
+        for attempt in range(self.CLONE_NAME_MAX_ATTEMPTS):
+            name = self._next_copy_name(original.name) if auto_name else new_name
+            
+            new_experiment = Experiment(
+                name=name,
+                description=original.description,
+                dataset_version_id=original.dataset_version_id,
+                # Both columns hold JSON data, so a JSON round-trip / list copy is a full copy
+                evaluation_target_config=json.loads(json.dumps(original.evaluation_target_config)),
+                evaluator_version_ids=list(original.evaluator_version_ids or []),
+                item_concur_num=original.item_concur_num,
+                expt_type=original.expt_type,
+                max_alive_time=original.max_alive_time,
+                created_by=original.created_by,
+            )
+            self.db.add(new_experiment)
+            try:
+                self.db.commit()
+            except IntegrityError:
+                self.db.rollback()
+                if not auto_name or attempt == self.CLONE_NAME_MAX_ATTEMPTS - 1:
+                    raise
+                continue
+            self.db.refresh(new_experiment)
+            return new_experiment
     
     def retry_experiment(
         self,
@@ -1961,10 +2051,20 @@ class ExperimentService:
     
     def batch_delete_experiments(self, experiment_ids: List[int]) -> int:
         """Batch delete experiments"""
-        deleted_count = 0
-        for experiment_id in experiment_ids:
-            if self.delete_experiment(experiment_id):
-                deleted_count += 1
+        if not experiment_ids:
+            return 0
+        
+        # Delete dependent rows first (children before parents) to avoid foreign key
+        # constraint errors; these mirror the ORM cascades used by delete_experiment
+        for model in (CeleryTaskLog, ExperimentResult, ExperimentRun, ExperimentAggregateResult, ExperimentResultExport):
+            self.db.query(model).filter(
+                model.experiment_id.in_(experiment_ids)
+            ).delete(synchronize_session=False)
+        
+        deleted_count = self.db.query(Experiment).filter(
+            Experiment.id.in_(experiment_ids)
+        ).delete(synchronize_session=False)
+        self.db.commit()
         return deleted_count
     
     def calculate_aggregate_results(
@@ -1983,74 +2083,3 @@ class ExperimentService:
     ) -> Dict[str, Any]:
         """Get experiment statistics"""
         return self.result_service.get_experiment_statistics(experiment_id, run_id)
-        
-        # Calculate statistics
-        total_count = len(results)
-        success_count = len([r for r in results if r.score is not None and r.error_message is None])
-        
-        # Failure count: explicitly has error message OR score is None (invalid result)
-        failure_count = len([r for r in results if r.error_message is not None or (r.score is None and r.error_message is None)])
-        
-        # Pending count: total - success - failure
-        # This ensures pending is 0 if all items are accounted for (either success or failure)
-        pending_count = max(0, total_count - success_count - failure_count)
-        
-        # If experiment is completed, pending should be 0
-        if experiment.status in [ExperimentStatus.COMPLETED, ExperimentStatus.FAILED, ExperimentStatus.STOPPED]:
-            pending_count = 0
-        
-        # Get aggregate results
-        aggregate_results = self.calculate_aggregate_results(experiment_id, run_id, save=False)
-        
-        # Calculate token usage from evaluator_records
-        evaluator_records_query = self.db.query(EvaluatorRecord).filter(
-            EvaluatorRecord.experiment_id == experiment_id
-        )
-        if run_id:
-            evaluator_records_query = evaluator_records_query.filter(
-                EvaluatorRecord.experiment_run_id == run_id
-            )
-        evaluator_records = evaluator_records_query.all()
-        
-        logger.info(f"[GetStatistics] Found {len(evaluator_records)} evaluator records for experiment {experiment_id}, run_id={run_id}")
-        
-        total_input_tokens = 0
-        total_output_tokens = 0
-        
-        for record in evaluator_records:
-            output_data = record.output_data or {}
-            logger.debug(f"[GetStatistics] Record {record.id}: output_data keys={list(output_data.keys()) if isinstance(output_data, dict) else 'not a dict'}")
-            
-            evaluator_usage = output_data.get("evaluator_usage", {})
-            logger.debug(f"[GetStatistics] Record {record.id}: evaluator_usage type={type(evaluator_usage)}, value={evaluator_usage}")
-            
-            if isinstance(evaluator_usage, dict):
-                input_tokens = evaluator_usage.get("input_tokens", 0)
-                output_tokens = evaluator_usage.get("output_tokens", 0)
-                logger.info(f"[GetStatistics] Record {record.id}: input_tokens={input_tokens} (type={type(input_tokens)}), output_tokens={output_tokens} (type={type(output_tokens)})")
-                
-                if isinstance(input_tokens, (int, float)) and input_tokens:
-                    total_input_tokens += int(input_tokens)
-                if isinstance(output_tokens, (int, float)) and output_tokens:
-                    total_output_tokens += int(output_tokens)
-            else:
-                logger.warning(f"[GetStatistics] Record {record.id}: evaluator_usage is not a dict, type={type(evaluator_usage)}, value={evaluator_usage}")
-                logger.warning(f"[GetStatistics] Record {record.id}: Full output_data={json.dumps(output_data, default=str, ensure_ascii=False)[:500]}")
-        
-        logger.info(f"[GetStatistics] Total tokens: input={total_input_tokens}, output={total_output_tokens}")
-        
-        token_usage = {
-            "input_tokens": total_input_tokens,
-            "output_tokens": total_output_tokens
-        }
-        
-        return {
-            "experiment_id": experiment_id,
-            "total_count": total_count,
-            "success_count": success_count,
-            "failure_count": failure_count,
-            "pending_count": pending_count,
-            "evaluator_aggregate_results": aggregate_results,
-            "token_usage": token_usage
-        }
-
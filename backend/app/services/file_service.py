@@ -9,13 +9,24 @@ from typing import Optional, Tuple
 from fastapi import UploadFile
 
 
+# Characters stripped from uploaded filenames
+_UNSAFE_FILENAME_RE = re.compile(r'[^\w\s-]')
+# Deletion table equivalent to _UNSAFE_FILENAME_RE for pure-ASCII names
+_UNSAFE_ASCII_TABLE = {
+    code: None for code in range(128) if _UNSAFE_FILENAME_RE.match(chr(code))
+}
+
+
 def secure_filename(filename: str) -> str:
     """
     Secure filename by removing dangerous characters
     Similar to werkzeug.utils.secure_filename
     """
     # Remove path separators and other dangerous characters
-    filename = re.sub(r'[^\w\s-]', '', filename)
+    if filename.isascii():
+        filename = filename.translate(_UNSAFE_ASCII_TABLE)
+    else:
+        filename = _UNSAFE_FILENAME_RE.sub('', filename)
     # Remove leading/trailing spaces and dots
     filename = filename.strip(' .')
     return filename
@@ -26,16 +37,17 @@ class FileService:
     
     # Supported file formats
     SUPPORTED_FORMATS = {
-        'csv': ['text/csv', 'application/vnd.ms-excel'],
-        'jsonl': ['application/jsonl', 'text/plain'],
-        'json': ['application/json'],
-        'xlsx': ['application/vnd.openxmlformats-officedocument.spreadsheetml.sheet', 'application/vnd.ms-excel'],
-        'xls': ['application/vnd.ms-excel', 'application/excel'],
-        'zip': ['application/zip', 'application/x-zip-compressed'],
+        'csv': frozenset({'text/csv', 'application/vnd.ms-excel'}),
+        'jsonl': frozenset({'application/jsonl', 'text/plain'}),
+        'json': frozenset({'application/json'}),
+        'xlsx': frozenset({'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet', 'application/vnd.ms-excel'}),
+        'xls': frozenset({'application/vnd.ms-excel', 'application/excel'}),
+        'zip': frozenset({'application/zip', 'application/x-zip-compressed'}),
     }
     
-    # Allowed file extensions
-    ALLOWED_EXTENSIONS = {'.csv', '.jsonl', '.json', '.xlsx', '.xls', '.zip'}
+    # Allowed file extensions, mapped to their format name
+    EXTENSION_FORMATS = {f'.{format_name}': format_name for format_name in SUPPORTED_FORMATS}
+    ALLOWED_EXTENSIONS = frozenset(EXTENSION_FORMATS)
     
     def __init__(self, upload_dir: str = "uploads/datasets"):
         """
@@ -63,17 +75,14 @@ class FileService:
         
         # Check file extension
         ext = Path(filename).suffix.lower()
-        if ext not in self.ALLOWED_EXTENSIONS:
+        format_name = self.EXTENSION_FORMATS.get(ext)
+        if format_name is None:
             return False, f"Unsupported file format. Allowed formats: {', '.join(self.ALLOWED_EXTENSIONS)}"
         
         # Check content type if provided
-        if content_type:
-            format_name = ext[1:]  # Remove the dot
-            if format_name in self.SUPPORTED_FORMATS:
-                allowed_types = self.SUPPORTED_FORMATS[format_name]
-                if content_type not in allowed_types:
-                    # Be lenient with content type checking
-                    pass
+        if content_type and content_type not in self.SUPPORTED_FORMATS[format_name]:
+            # Be lenient with content type checking
+            pass
         
         return True, None
     
@@ -87,14 +96,7 @@ class FileService:
         Returns:
             File format (csv, jsonl, json, xlsx, xls, zip) or None
         """
-        ext = Path(filename).suffix.lower()
-        if ext:
-            format_name = ext[1:]  # Remove the dot
-            # Normalize xls and xlsx
-            if format_name in ['xlsx', 'xls']:
-                return format_name
-            return format_name
-        return None
+        return self.EXTENSION_FORMATS.get(Path(filename).suffix.lower())
     
     def save_file(self, file: UploadFile, dataset_id: Optional[int] = None) -> Tuple[str, str]:
         """
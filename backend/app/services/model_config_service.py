@@ -1,15 +1,173 @@
 """
 Model configuration service
 """
-from typing import Dict, List, Optional, Any
+from datetime import datetime
+from functools import lru_cache
+from typing import Dict, Iterator, List, Optional, Any
+from sqlalchemy import func, select, update
 from sqlalchemy.orm import Session
 from sqlalchemy.exc import IntegrityError
 from app.models.model_config import ModelConfig
 from app.utils.crypto import encrypt_api_key, decrypt_api_key, mask_api_key
+from app.utils.db_errors import is_unique_violation
+from app.utils.db_features import supports_window_functions
+from app.utils.search_utils import name_search_clause
 import logging
 
 logger = logging.getLogger(__name__)
 
+# Rows fetched per round-trip when streaming configurations
+STREAM_BATCH_SIZE = 500
+
+# Columns returned by list endpoints (api_key is only selected when needed)
+_LIST_COLUMNS = (
+    ModelConfig.id,
+    ModelConfig.config_name,
+    ModelConfig.model_type,
+    ModelConfig.model_version,
+    ModelConfig.api_base,
+    ModelConfig.temperature,
+    ModelConfig.max_tokens,
+    ModelConfig.timeout,
+    ModelConfig.is_enabled,
+    ModelConfig.created_at,
+    ModelConfig.updated_at,
+    ModelConfig.created_by,
+)
+_LIST_COLUMNS_WITH_KEY = _LIST_COLUMNS + (ModelConfig.api_key,)
+
+# Columns needed to build an autogen config
+_AUTOGEN_COLUMNS = (
+    ModelConfig.id,
+    ModelConfig.updated_at,
+    ModelConfig.model_version,
+    ModelConfig.api_base,
+    ModelConfig.temperature,
+    ModelConfig.max_tokens,
+    ModelConfig.api_key,
+)
+
+
+def _config_to_dict(config: Any, include_sensitive: bool = False) -> Dict[str, Any]:
+    """
+    Convert a model configuration to a response dictionary
+    
+    Args:
+        config: ModelConfig instance or a selected row with the same attribute names
+        include_sensitive: Whether to include the (masked) api_key
+    """
+    created_at = config.created_at
+    updated_at = config.updated_at
+    config_dict = {
+        'id': config.id,
+        'config_name': config.config_name,
+        'model_type': config.model_type,
+        'model_version': config.model_version,
+        'api_base': config.api_base,
+        'temperature': config.temperature,
+        'max_tokens': config.max_tokens,
+        'timeout': config.timeout,
+        'is_enabled': config.is_enabled,
+        'created_at': created_at.isoformat() if created_at else None,
+        'updated_at': updated_at.isoformat() if updated_at else None,
+        'created_by': config.created_by,
+    }
+    
+    if include_sensitive:
+        # Return masked API key instead of plain text for security
+        config_dict['api_key'] = mask_api_key(config.api_key)
+    
+    return config_dict
+
+
+def _required(message: str):
+    """Validator rejecting empty values"""
+    def validate(value: Any) -> Optional[str]:
+        return None if value else message
+    return validate
+
+
+def _validate_temperature(value: Any) -> Optional[str]:
+    if value is None:
+        return None
+    try:
+        temp = float(value)
+    except (ValueError, TypeError):
+        return 'Temperature must be a valid number'
+    if temp < 0 or temp > 2:
+        return 'Temperature must be between 0 and 2'
+    return None
+
+
+def _validate_max_tokens(value: Any) -> Optional[str]:
+    if value is None:
+        return None
+    try:
+        tokens = int(value)
+    except (ValueError, TypeError):
+        return 'Max tokens must be a valid integer'
+    if tokens < 1:
+        return 'Max tokens must be greater than 0'
+    return None
+
+
+def _validate_timeout(value: Any) -> Optional[str]:
+    if value is None:
+        return None
+    try:
+        timeout = int(value)
+    except (ValueError, TypeError):
+        return 'Timeout must be a valid integer'
+    if timeout < 1:
+        return 'Timeout must be greater than 0'
+    if timeout > 600:  # Max 10 minutes
+        return 'Timeout must be less than or equal to 600 seconds'
+    return None
+
+
+# Field name -> validator returning an error message or None
+_CONFIG_VALIDATORS = {
+    'config_name': _required('Configuration name cannot be empty'),
+    'model_type': _required('Model type cannot be empty'),
+    'model_version': _required('Model version cannot be empty'),
+    'api_key': _required('API key cannot be empty'),
+    'temperature': _validate_temperature,
+    'max_tokens': _validate_max_tokens,
+    'timeout': _validate_timeout,
+}
+
+
+@lru_cache(maxsize=256)
+def _build_autogen_config(
+    config_id: int,
+    updated_at: Optional[datetime],
+    model_version: str,
+    api_base: Optional[str],
+    temperature: Optional[float],
+    max_tokens: Optional[int],
+    encrypted_api_key: str,
+) -> Dict[str, Any]:
+    """
+    Build the autogen config for one version of a model configuration.
+    
+    Cached by (config_id, updated_at) together with the stored values, so the
+    API key is only decrypted again after the configuration changes.
+    """
+    # Decrypt API key for internal use
+    autogen_config = {
+        "model": model_version,
+        "api_key": decrypt_api_key(encrypted_api_key),
+        "base_url": api_base,
+    }
+    
+    # Add optional parameters
+    if temperature is not None:
+        autogen_config["temperature"] = temperature
+    if max_tokens is not None:
+        autogen_config["max_tokens"] = max_tokens
+    
+    return autogen_config
+
 
 class ModelConfigService:
     """Service for managing model configurations"""
@@ -17,7 +175,7 @@ class ModelConfigService:
     def __init__(self, db: Session):
         self.db = db
     
-    def get_all_configs(self, include_sensitive: bool = False, skip: int = 0, limit: int = 100, name: Optional[str] = None) -> tuple[List[Dict[str, Any]], int]:
+    def get_all_configs(self, include_sensitive: bool = False, skip: int = 0, limit: int = 100, name: Optional[str] = None, name_prefix: bool = False) -> tuple[List[Dict[str, Any]], int]:
         """
         Get all model configurations with pagination and search
         
@@ -25,47 +183,89 @@ class ModelConfigService:
             include_sensitive: Whether to include sensitive fields like api_key
             skip: Number of records to skip
             limit: Maximum number of records to return
-            name: Optional search term for config_name (partial match)
+            name: Optional search term for config_name (partial match, case-insensitive)
+            name_prefix: Match only names starting with the search term, which
+                MySQL can serve from the config_name index
             
         Returns:
             Tuple of (list of model configurations, total count)
         """
-        # Build query with optional name filter
-        query = self.db.query(ModelConfig)
-        if name:
-            query = query.filter(ModelConfig.config_name.ilike(f'%{name}%'))
-        
-        # Get total count
-        total = query.count()
-        
-        # Get paginated results
-        configs = query.order_by(ModelConfig.id.asc()).offset(skip).limit(limit).all()
-        
-        result = []
-        for config in configs:
-            config_dict = {
-                'id': config.id,
-                'config_name': config.config_name,
-                'model_type': config.model_type,
-                'model_version': config.model_version,
-                'api_base': config.api_base,
-                'temperature': config.temperature,
-                'max_tokens': config.max_tokens,
-                'timeout': config.timeout,
-                'is_enabled': config.is_enabled,
-                'created_at': config.created_at.isoformat() if config.created_at else None,
-                'updated_at': config.updated_at.isoformat() if config.updated_at else None,
-                'created_by': config.created_by,
-            }
-            
-            if include_sensitive:
-                # Return masked API key instead of plain text for security
-                config_dict['api_key'] = mask_api_key(config.api_key)
+        # Fetch the page as plain rows (only the needed columns, no ORM hydration)
+        columns = _LIST_COLUMNS_WITH_KEY if include_sensitive else _LIST_COLUMNS
+        filters = self._build_list_filters(name, name_prefix)
+        count_stmt = select(func.count()).select_from(ModelConfig).where(*filters)
+        
+        if supports_window_functions(self.db):
+            # The total is computed in the same statement with a window function
+            stmt = (
+                select(*columns, func.count().over().label('total'))
+                .where(*filters)
+                .order_by(ModelConfig.id.asc())
+                .offset(skip)
+                .limit(limit)
+            )
+            rows = self.db.execute(stmt).all()
             
-            result.append(config_dict)
+            if rows:
+                total = rows[0].total
+            elif skip or not limit:
+                # Page past the end (or limit=0): no row carries the total, count separately
+                total = self.db.execute(count_stmt).scalar()
+            else:
+                total = 0
+        else:
+            # MySQL 5.7 has no window functions: count separately
+            stmt = (
+                select(*columns)
+                .where(*filters)
+                .order_by(ModelConfig.id.asc())
+                .offset(skip)
+                .limit(limit)
+            )
+            rows = self.db.execute(stmt).all()
+            total = self.db.execute(count_stmt).scalar()
+        
+        result = [_config_to_dict(row, include_sensitive) for row in rows]
         
         return result, total
     
+    def iter_configs(self, include_sensitive: bool = False, name: Optional[str] = None, name_prefix: bool = False) -> Iterator[Dict[str, Any]]:
+        """
+        Stream all model configurations without materializing the full list
+        
+        Rows are fetched in batches of STREAM_BATCH_SIZE using a server-side
+        cursor, so memory use stays constant regardless of the table size.
+        
+        Args:
+            include_sensitive: Whether to include sensitive fields like api_key
+            name: Optional search term for config_name (same semantics as get_all_configs)
+            name_prefix: Match only names starting with the search term
+            
+        Yields:
+            Model configuration dictionaries ordered by ID
+        """
+        columns = _LIST_COLUMNS_WITH_KEY if include_sensitive else _LIST_COLUMNS
+        stmt = (
+            select(*columns)
+            .where(*self._build_list_filters(name, name_prefix))
+            .order_by(ModelConfig.id.asc())
+            .execution_options(yield_per=STREAM_BATCH_SIZE)
+        )
+        result = self.db.execute(stmt)
+        try:
+            for partition in result.partitions():
+                for row in partition:
+                    yield _config_to_dict(row, include_sensitive)
+        finally:
+            result.close()
+    
+    def _build_list_filters(self, name: Optional[str] = None, name_prefix: bool = False) -> list:
+        """Build WHERE clauses for listing configurations"""
+        filters = []
+        if name:
+            filters.append(name_search_clause(self.db, ModelConfig.config_name, name, prefix=name_prefix))
+        return filters
+    
     def get_config_by_id(self, config_id: int, include_sensitive: bool = False) -> Optional[Dict[str, Any]]:
         """
         Get model configuration by ID
@@ -77,31 +277,34 @@ class ModelConfigService:
         Returns:
             Model configuration dictionary or None
         """
-        config = self.db.query(ModelConfig).filter(ModelConfig.id == config_id).first()
+        config = self.db.get(ModelConfig, config_id)
         
         if not config:
             return None
         
-        config_dict = {
-            'id': config.id,
-            'config_name': config.config_name,
-            'model_type': config.model_type,
-            'model_version': config.model_version,
-            'api_base': config.api_base,
-            'temperature': config.temperature,
-            'max_tokens': config.max_tokens,
-            'timeout': config.timeout,
-            'is_enabled': config.is_enabled,
-            'created_at': config.created_at.isoformat() if config.created_at else None,
-            'updated_at': config.updated_at.isoformat() if config.updated_at else None,
-            'created_by': config.created_by,
-        }
-        
-        if include_sensitive:
-            # Return masked API key instead of plain text for security
-            config_dict['api_key'] = mask_api_key(config.api_key)
-        
-        return config_dict
+        return _config_to_dict(config, include_sensitive)
+    
+    def get_configs_by_ids(self, config_ids: List[int], include_sensitive: bool = False) -> Dict[int, Dict[str, Any]]:
+        """
+        Get multiple model configurations with a single query
+        
+        Args:
+            config_ids: Configuration IDs
+            include_sensitive: Whether to include sensitive fields like api_key
+            
+        Returns:
+            Dictionary mapping configuration ID to configuration dictionary
+            (IDs that don't exist are omitted)
+        """
+        if not config_ids:
+            return {}
+        
+        columns = _LIST_COLUMNS_WITH_KEY if include_sensitive else _LIST_COLUMNS
+        rows = self.db.execute(
+            select(*columns).where(ModelConfig.id.in_(set(config_ids)))
+        ).all()
+        
+        return {row.id: _config_to_dict(row, include_sensitive) for row in rows}
     
     def create_config(self, config_data: Dict[str, Any]) -> Dict[str, Any]:
         """
@@ -122,17 +325,7 @@ class ModelConfigService:
                 'errors': validation_errors
             }
         
-        # Check if config_name already exists
-        existing = self.db.query(ModelConfig).filter(
-            ModelConfig.config_name == config_data['config_name']
-        ).first()
-        
-        if existing:
-            return {
-                'success': False,
-                'message': f'Configuration name "{config_data["config_name"]}" already exists'
-            }
-        
+        # config_name uniqueness is enforced by the unique index (see IntegrityError below)
         try:
             # Encrypt API key before storing
             encrypted_api_key = encrypt_api_key(config_data['api_key'])
@@ -151,17 +344,26 @@ class ModelConfigService:
             )
             
             self.db.add(config)
+            # id comes back from the INSERT and the timestamps are Python-side
+            # defaults (whole seconds, as stored), so serialize after flush instead
+            # of refreshing after commit
+            self.db.flush()
+            data = _config_to_dict(config, include_sensitive=True)
             self.db.commit()
-            self.db.refresh(config)
             
-            logger.info(f"Model configuration created: {config.config_name}")
+            logger.info(f"Model configuration created: {data['config_name']}")
             return {
                 'success': True,
                 'message': 'Configuration created successfully',
-                'data': self.get_config_by_id(config.id, include_sensitive=True)
+                'data': data
             }
         except IntegrityError as e:
             self.db.rollback()
+            if is_unique_violation(e):
+                return {
+                    'success': False,
+                    'message': f'Configuration name "{config_data.get("config_name")}" already exists'
+                }
             logger.error(f"Failed to create model configuration: {str(e)}")
             return {
                 'success': False,
@@ -186,7 +388,7 @@ class ModelConfigService:
         Returns:
             Result dictionary with success status and message
         """
-        config = self.db.query(ModelConfig).filter(ModelConfig.id == config_id).first()
+        config = self.db.get(ModelConfig, config_id)
         
         if not config:
             return {
@@ -195,7 +397,7 @@ class ModelConfigService:
             }
         
         # Validate required fields
-        validation_errors = self.validate_config(config_data, exclude_id=config_id)
+        validation_errors = self.validate_config(config_data)
         if validation_errors:
             return {
                 'success': False,
@@ -203,19 +405,7 @@ class ModelConfigService:
                 'errors': validation_errors
             }
         
-        # Check if config_name already exists (excluding current config)
-        if 'config_name' in config_data:
-            existing = self.db.query(ModelConfig).filter(
-                ModelConfig.config_name == config_data['config_name'],
-                ModelConfig.id != config_id
-            ).first()
-            
-            if existing:
-                return {
-                    'success': False,
-                    'message': f'Configuration name "{config_data["config_name"]}" already exists'
-                }
-        
+        # config_name uniqueness is enforced by the unique index (see IntegrityError below)
         try:
             # Update fields
             if 'config_name' in config_data:
@@ -238,17 +428,27 @@ class ModelConfigService:
             if 'created_by' in config_data:
                 config.created_by = config_data.get('created_by')
             
+            # updated_at is set by the Python-side onupdate during flush, so the
+            # response can be built without a refresh SELECT after commit
+            self.db.flush()
+            data = _config_to_dict(config, include_sensitive=True)
             self.db.commit()
-            self.db.refresh(config)
+            # Drop cached decrypted keys of previous versions
+            _build_autogen_config.cache_clear()
             
-            logger.info(f"Model configuration updated: {config.config_name}")
+            logger.info(f"Model configuration updated: {data['config_name']}")
             return {
                 'success': True,
                 'message': 'Configuration updated successfully',
-                'data': self.get_config_by_id(config.id, include_sensitive=True)
+                'data': data
             }
         except IntegrityError as e:
             self.db.rollback()
+            if is_unique_violation(e):
+                return {
+                    'success': False,
+                    'message': f'Configuration name "{config_data.get("config_name")}" already exists'
+                }
             logger.error(f"Failed to update model configuration: {str(e)}")
             return {
                 'success': False,
@@ -272,7 +472,7 @@ class ModelConfigService:
         Returns:
             Result dictionary with success status and message
         """
-        config = self.db.query(ModelConfig).filter(ModelConfig.id == config_id).first()
+        config = self.db.get(ModelConfig, config_id)
         
         if not config:
             return {
@@ -284,6 +484,7 @@ class ModelConfigService:
             config_name = config.config_name
             self.db.delete(config)
             self.db.commit()
+            _build_autogen_config.cache_clear()
             
             logger.info(f"Model configuration deleted: {config_name}")
             return {
@@ -309,29 +510,32 @@ class ModelConfigService:
         Returns:
             Result dictionary with success status and message
         """
-        config = self.db.query(ModelConfig).filter(ModelConfig.id == config_id).first()
+        # Only the name is needed for the response message; flip the flag with a
+        # single UPDATE instead of loading and refreshing the whole row
+        config_name = self.db.execute(
+            select(ModelConfig.config_name).where(ModelConfig.id == config_id)
+        ).scalar()
         
-        if not config:
+        if config_name is None:
             return {
                 'success': False,
                 'message': 'Configuration not found'
             }
         
         try:
-            if enabled:
-                # Check if there are other enabled configs (optional: allow multiple enabled)
-                # For now, we allow multiple enabled configs
-                pass
-            
-            config.is_enabled = enabled
+            # Multiple enabled configs are allowed, so enabling needs no extra checks
+            self.db.execute(
+                update(ModelConfig)
+                .where(ModelConfig.id == config_id)
+                .values(is_enabled=enabled)
+            )
             self.db.commit()
-            self.db.refresh(config)
             
             status_text = 'enabled' if enabled else 'disabled'
-            logger.info(f"Model configuration {status_text}: {config.config_name}")
+            logger.info(f"Model configuration {status_text}: {config_name}")
             return {
                 'success': True,
-                'message': f'Configuration "{config.config_name}" has been {status_text}'
+                'message': f'Configuration "{config_name}" has been {status_text}'
             }
         except Exception as e:
             self.db.rollback()
@@ -351,85 +555,62 @@ class ModelConfigService:
         Returns:
             Autogen configuration dictionary or None
         """
-        config = self.db.query(ModelConfig).filter(ModelConfig.id == config_id).first()
+        config = self.db.execute(
+            select(*_AUTOGEN_COLUMNS).where(ModelConfig.id == config_id)
+        ).first()
         
         if not config:
             return None
         
-        # Decrypt API key for internal use
-        decrypted_api_key = decrypt_api_key(config.api_key)
-        
-        # Build autogen config based on model type
-        autogen_config = {
-            "model": config.model_version,
-            "api_key": decrypted_api_key,
-            "base_url": config.api_base,
-        }
-        
-        # Add optional parameters
-        if config.temperature is not None:
-            autogen_config["temperature"] = config.temperature
-        if config.max_tokens is not None:
-            autogen_config["max_tokens"] = config.max_tokens
+        # Copy so callers can't mutate the cached entry
+        autogen_config = dict(_build_autogen_config(*config))
         
         # Note: timeout is handled by create_autogen_config_from_model_config
         # which wraps this in the proper format with config_list and timeout
         
         return autogen_config
     
-    def validate_config(self, config_data: Dict[str, Any], exclude_id: Optional[int] = None) -> Dict[str, str]:
+    def get_autogen_configs_by_ids(self, config_ids: List[int]) -> Dict[int, Dict[str, Any]]:
+        """
+        Get autogen-compatible configurations for multiple IDs with a single query
+        
+        Args:
+            config_ids: Configuration IDs
+            
+        Returns:
+            Dictionary mapping configuration ID to autogen configuration
+            (IDs that don't exist are omitted)
+        """
+        if not config_ids:
+            return {}
+        
+        rows = self.db.execute(
+            select(*_AUTOGEN_COLUMNS).where(ModelConfig.id.in_(set(config_ids)))
+        ).all()
+        
+        return {row.id: dict(_build_autogen_config(*row)) for row in rows}
+    
+    def validate_config(self, config_data: Dict[str, Any]) -> Dict[str, str]:
         """
         Validate configuration data
         
         Args:
             config_data: Configuration data dictionary
-            exclude_id: ID to exclude from uniqueness check (for updates)
             
         Returns:
             Dictionary of validation errors (empty if valid)
+        
+        config_name uniqueness is not checked here; the unique index rejects
+        duplicates at write time so the common path needs no extra SELECT.
         """
         errors = {}
-        
-        if 'config_name' in config_data and not config_data.get('config_name'):
-            errors['config_name'] = 'Configuration name cannot be empty'
-        
-        if 'model_type' in config_data and not config_data.get('model_type'):
-            errors['model_type'] = 'Model type cannot be empty'
-        
-        if 'model_version' in config_data and not config_data.get('model_version'):
-            errors['model_version'] = 'Model version cannot be empty'
-        
-        if 'api_key' in config_data and not config_data.get('api_key'):
-            errors['api_key'] = 'API key cannot be empty'
-        
-        # Validate temperature if provided
-        if 'temperature' in config_data and config_data.get('temperature') is not None:
-            try:
-                temp = float(config_data['temperature'])
-                if temp < 0 or temp > 2:
-                    errors['temperature'] = 'Temperature must be between 0 and 2'
-            except (ValueError, TypeError):
-                errors['temperature'] = 'Temperature must be a valid number'
-        
-        # Validate max_tokens if provided
-        if 'max_tokens' in config_data and config_data.get('max_tokens') is not None:
-            try:
-                tokens = int(config_data['max_tokens'])
-                if tokens < 1:
-                    errors['max_tokens'] = 'Max tokens must be greater than 0'
-            except (ValueError, TypeError):
-                errors['max_tokens'] = 'Max tokens must be a valid integer'
-        
-        # Validate timeout if provided
-        if 'timeout' in config_data and config_data.get('timeout') is not None:
-            try:
-                timeout = int(config_data['timeout'])
-                if timeout < 1:
-                    errors['timeout'] = 'Timeout must be greater than 0'
-                if timeout > 600:  # Max 10 minutes
-                    errors['timeout'] = 'Timeout must be less than or equal to 600 seconds'
-            except (ValueError, TypeError):
-                errors['timeout'] = 'Timeout must be a valid integer'
+        for key, value in config_data.items():
+            validator = _CONFIG_VALIDATORS.get(key)
+            if validator is None:
+                continue
+            error = validator(value)
+            if error:
+                errors[key] = error
         
         return errors
 
@@ -1,54 +1,513 @@
 """
 Model set service
 """
+import copy
+import functools
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from typing import Dict, List, Optional, Any
+from sqlalchemy import delete, func, select
 from sqlalchemy.orm import Session
 from sqlalchemy.exc import IntegrityError
 from app.models.model_set import ModelSet
 from app.utils.crypto import encrypt_api_key, decrypt_api_key, mask_api_key
+from app.utils.db_errors import is_unique_violation
+from app.utils.db_features import supports_window_functions
+from app.core.config import settings
+from app.core.http_client import get_http_client
+from app.utils.search_utils import name_search_clause
 import logging
 import json
+import re
 import httpx
-from autogen import ConversableAgent
 import asyncio
+import orjson
+from pydantic import BaseModel, ConfigDict, ValidationError, ValidationInfo, field_validator
 
 logger = logging.getLogger(__name__)
 
+# Columns returned by the list endpoint
+_LIST_COLUMNS = (
+    ModelSet.id,
+    ModelSet.name,
+    ModelSet.description,
+    ModelSet.type,
+    ModelSet.config,
+    ModelSet.created_at,
+    ModelSet.updated_at,
+    ModelSet.created_by,
+)
+
+# Debug configs with the API key already decrypted, plus the compiled
+# api_body_template (see _compile_template), keyed by (model_set_id, updated_at).
+# A write bumps updated_at (stored with microseconds) so no worker hits a stale
+# entry; writes also clear this process's cache right away
+_DEBUG_CONFIG_CACHE: "OrderedDict[tuple, tuple]" = OrderedDict()
+_DEBUG_CONFIG_CACHE_SIZE = 256
+
+
+# Listing totals keyed by the name filter: {(name, name_prefix): (expires_at, total)}.
+# Writes that change the row set (create, rename, delete) clear it
+_TOTAL_CACHE: Dict[tuple, tuple] = {}
+_TOTAL_CACHE_SIZE = 128
+_TOTAL_CACHE_TTL = 30.0
+
+
+def _json_dumps(obj: Any, indent: bool = False) -> str:
+    """Serialize to a JSON string without ASCII-escaping"""
+    option = orjson.OPT_NON_STR_KEYS | (orjson.OPT_INDENT_2 if indent else 0)
+    try:
+        return orjson.dumps(obj, option=option).decode('utf-8')
+    except TypeError:
+        # User-supplied data orjson can't encode (e.g. integers beyond 64 bits)
+        return json.dumps(obj, ensure_ascii=False, indent=2 if indent else None, default=str)
+
+
+def _json_preview(obj: Any, limit: int) -> str:
+    """Serialize for a log line, keeping only the first `limit` bytes (UTF-8)"""
+    try:
+        # Truncate the bytes before decoding instead of decoding the full payload
+        return orjson.dumps(obj, option=orjson.OPT_NON_STR_KEYS)[:limit].decode('utf-8', errors='ignore')
+    except TypeError:
+        return json.dumps(obj, ensure_ascii=False, default=str)[:limit]
+
+
+def _json_loads(data: Any) -> Any:
+    """Parse JSON from str or bytes"""
+    return orjson.loads(data)
+
+
+# Keywords in a response message that mark a business error despite HTTP 200
+_ERROR_KEYWORDS_RE = re.compile(r'error|异常|失败', re.IGNORECASE)
+
+# Message role -> prefix used when flattening debug messages into one prompt
+_ROLE_PREFIXES = {
+    'user': '',
+    'assistant': 'Assistant: ',
+    'system': 'System: ',
+}
+
+# Default base URLs of the OpenAI-compatible model types (the same defaults
+# create_autogen_config_from_model_config applies); legacy debug configs of these
+# types, or with an explicit api_base, call /chat/completions directly
+_OPENAI_COMPATIBLE_BASE_URLS = {
+    'openai': 'https://api.openai.com/v1',
+    'qwen': 'https://dashscope.aliyuncs.com/compatible-mode/v1',
+    'aliyun': 'https://dashscope.aliyuncs.com/compatible-mode/v1',
+    'dashscope': 'https://dashscope.aliyuncs.com/compatible-mode/v1',
+    'deepseek': 'https://api.deepseek.com',
+}
+
+# Sent with every debug completion, as create_autogen_config_from_model_config does,
+# so thinking models answer directly
+_DEBUG_EXTRA_BODY = {
+    "enable_thinking": False,
+    "thinking_depth": 0,
+}
+
+_DEBUG_SYSTEM_MESSAGE = "You are a helpful assistant. Respond to user requests directly and concisely."
+
+# Supported debug HTTP methods -> request argument that carries the body
+_HTTP_METHOD_BODY_PARAMS = {
+    'POST': 'json',
+    'GET': 'params',
+    'PUT': 'json',
+    'PATCH': 'json',
+}
+
+
+async def _read_response_body(response: httpx.Response, max_bytes: int) -> Optional[bytes]:
+    """
+    Read a streamed response body, giving up once it exceeds max_bytes
+    
+    Returns:
+        Body bytes, or None if the body is larger than max_bytes
+    """
+    content_length = response.headers.get('content-length')
+    if content_length and content_length.isdigit() and int(content_length) > max_bytes:
+        return None
+    
+    chunks = []
+    size = 0
+    async for chunk in response.aiter_bytes():
+        size += len(chunk)
+        if size > max_bytes:
+            return None
+        chunks.append(chunk)
+    return b''.join(chunks)
+
+
+# {key} placeholder inside an api_body_template string
+_PLACEHOLDER_RE = re.compile(r'\{([^{}"\\]+)\}')
+
+
+def _parse_json_like(value: str) -> Any:
+    """Parse a string that looks like a JSON object/array, else return it unchanged"""
+    stripped = value.strip()
+    if (stripped.startswith('{') and stripped.endswith('}')) or \
+       (stripped.startswith('[') and stripped.endswith(']')):
+        try:
+            return _json_loads(value)
+        except (json.JSONDecodeError, ValueError):
+            pass
+    return value
+
+
+def _expand_text(text: str, data: Dict[str, Any]) -> str:
+    """Replace placeholders embedded in text with the values' text form (unknown keys are kept)"""
+    def replace(match: re.Match) -> str:
+        key = match.group(1)
+        if key not in data:
+            return match.group(0)
+        value = data[key]
+        return value if isinstance(value, str) else _json_dumps(value)
+    
+    return _PLACEHOLDER_RE.sub(replace, text)
+
+
+def _expand_string(text: str, data: Dict[str, Any]) -> Any:
+    """
+    Expand placeholders in a single template string value
+    
+    A string that is exactly "{key}" is replaced by the mapped value itself, so
+    numbers, objects and lists keep their type. A JSON-looking string that had a
+    placeholder filled in (the value itself, or a field such as a paramMap holding
+    JSON text) is parsed into an object.
+    """
+    match = _PLACEHOLDER_RE.fullmatch(text)
+    if match and match.group(1) in data:
+        value = data[match.group(1)]
+        return _parse_json_like(value) if isinstance(value, str) else value
+    expanded = _expand_text(text, data)
+    return _parse_json_like(expanded) if expanded != text else expanded
+
+
+def _substitute(node: Any, data: Dict[str, Any]) -> Any:
+    """
+    Build a request body by substituting placeholders throughout a template
+    
+    Args:
+        node: Template node (dict, list, string or scalar)
+        data: Placeholder key -> value mapping
+        
+    Returns:
+        New node with placeholders replaced; the template is not modified
+    """
+    if isinstance(node, str):
+        return _expand_string(node, data)
+    if isinstance(node, dict):
+        return {_expand_text(k, data): _substitute(v, data) for k, v in node.items()}
+    if isinstance(node, list):
+        return [_substitute(item, data) for item in node]
+    return node
+
+
+def _compile_template(template: Any) -> Optional[tuple]:
+    """
+    Find the placeholder-bearing string leaves of a template
+    
+    Returns:
+        Tuple of paths (tuples of dict keys / list indexes) to the string leaves
+        that contain placeholders, or None if a dict key contains a placeholder
+        (such templates are expanded with _substitute instead)
+    """
+    paths = []
+    
+    def walk(node: Any, path: tuple) -> bool:
+        if isinstance(node, str):
+            if _PLACEHOLDER_RE.search(node):
+                paths.append(path)
+        elif isinstance(node, dict):
+            for key, value in node.items():
+                if isinstance(key, str) and _PLACEHOLDER_RE.search(key):
+                    return False
+                if not walk(value, path + (key,)):
+                    return False
+        elif isinstance(node, list):
+            for index, item in enumerate(node):
+                if not walk(item, path + (index,)):
+                    return False
+        return True
+    
+    return tuple(paths) if walk(template, ()) else None
+
+
+def _apply_compiled_template(template: Any, paths: tuple, data: Dict[str, Any]) -> Any:
+    """
+    Build a request body from a template compiled by _compile_template
+    
+    Only the placeholder leaves are expanded; everything else is copied as is.
+    """
+    if paths == ((),):
+        # The template itself is a single string
+        return _expand_string(template, data)
+    
+    body = copy.deepcopy(template)
+    for path in paths:
+        parent = body
+        for key in path[:-1]:
+            parent = parent[key]
+        parent[path[-1]] = _expand_string(parent[path[-1]], data)
+    return body
+
+
+class _DebugModelConfig(BaseModel):
+    """
+    Typed view of a legacy llm_model config (one without model_config_id)
+    
+    Config values may come as strings from JSON; pydantic coerces them once, and
+    values that can't be converted fall back to the field default.
+    """
+    model_config = ConfigDict(protected_namespaces=())
+    
+    model_type: Optional[str] = 'openai'
+    model_version: Optional[str] = None
+    api_key: Optional[str] = None
+    api_base: Optional[str] = None
+    temperature: Optional[float] = None
+    max_tokens: Optional[int] = None
+    timeout: int = 120
+    
+    @field_validator('temperature', 'max_tokens', 'timeout', mode='wrap')
+    @classmethod
+    def _default_on_error(cls, value: Any, handler: Any, info: ValidationInfo) -> Any:
+        try:
+            return handler(value)
+        except ValidationError:
+            return cls.model_fields[info.field_name].default
+
+
+# (preferred key, fallback key) for input and output token counts in usage dicts
+_USAGE_KEYS = (('input_tokens', 'prompt_tokens'), ('output_tokens', 'completion_tokens'))
+
+
+def _extract_usage(agent: Any) -> tuple:
+    """
+    Extract (input_tokens, output_tokens) from an AutoGen agent's internal state
+    
+    Sources are tried in priority order (last chat message usage, agent.usage,
+    agent.last_cost); each count comes from the first source that has it, and
+    the lookup stops as soon as both are known.
+    """
+    chat_messages = getattr(agent, 'chat_messages', None)
+    last_message = chat_messages[-1] if isinstance(chat_messages, list) and chat_messages else None
+    sources = (
+        last_message.get('usage') if isinstance(last_message, dict) else None,
+        getattr(agent, 'usage', None),
+        getattr(agent, 'last_cost', None),
+    )
+    
+    tokens = [0, 0]
+    for source in sources:
+        if not isinstance(source, dict):
+            continue
+        for index, (key, fallback_key) in enumerate(_USAGE_KEYS):
+            if not tokens[index]:
+                tokens[index] = source.get(key, 0) or source.get(fallback_key, 0)
+        if all(tokens):
+            break
+    return tokens[0], tokens[1]
+
+
+# Valid model set types mapped to the config keys each one requires
+_REQUIRED_CONFIG_KEYS = {
+    'agent_api': (('api_url', 'API URL is required for agent_api type'),),
+    'llm_model': (
+        ('model_version', 'Model version is required'),
+        ('api_key', 'API key is required'),
+    ),
+}
+
+
+def _generate_debug_reply(debug_config: "_DebugModelConfig", messages: List[Dict[str, Any]]) -> tuple:
+    """
+    Build a debug AutoGen agent and run one generate_reply (blocking; call from a worker thread)
+    
+    Only used for legacy llm_model configs of a model type with no known
+    OpenAI-compatible endpoint, so the agent is not cached.
+    
+    Returns:
+        (response, (input_tokens, output_tokens))
+    """
+    # Import here to avoid circular import with autogen_helper, and to keep the
+    # autogen package off the import path of the rest of this service
+    from autogen import ConversableAgent
+    from app.utils.autogen_helper import create_autogen_config_from_model_config
+    
+    agent = ConversableAgent(
+        name="debug_agent",
+        system_message=_DEBUG_SYSTEM_MESSAGE,
+        llm_config=create_autogen_config_from_model_config(debug_config.model_dump()),
+        human_input_mode="NEVER",
+        max_consecutive_auto_reply=1,
+    )
+    response = agent.generate_reply(messages=messages)
+    
+    # Try to extract token usage from agent's internal state
+    try:
+        usage = _extract_usage(agent)
+    except Exception as e:
+        logger.warning("Failed to extract token usage from AutoGen agent: %s", e)
+        usage = (0, 0)
+    
+    return response, usage
+
+
+def _get_cached_total(key: tuple) -> Optional[int]:
+    """Return the cached listing total for a name filter, or None if missing or expired"""
+    entry = _TOTAL_CACHE.get(key)
+    if entry is None or entry[0] < time.monotonic():
+        return None
+    return entry[1]
+
+
+def _cache_total(key: tuple, total: int) -> None:
+    """Cache the listing total for a name filter"""
+    if key not in _TOTAL_CACHE and len(_TOTAL_CACHE) >= _TOTAL_CACHE_SIZE:
+        _TOTAL_CACHE.pop(next(iter(_TOTAL_CACHE)))
+    _TOTAL_CACHE[key] = (time.monotonic() + _TOTAL_CACHE_TTL, total)
+
+
+def _masked_config(model_set_type: str, config: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    Mask the API key in a model set config for security
+    
+    The stored key is never decrypted (masking the ciphertext is enough), and the
+    config is only copied when there is a key to mask; others are returned as loaded.
+    """
+    config = config or {}
+    if model_set_type == 'llm_model' and 'api_key' in config:
+        return {**config, 'api_key': mask_api_key(config['api_key'])}
+    return config
+
+
+def _model_set_rows_to_dicts(rows: List[Any]) -> List[Dict[str, Any]]:
+    """
+    Convert rows selected with _LIST_COLUMNS (plus any trailing columns) to dictionaries
+    
+    Unpacks each row tuple once in a single comprehension instead of doing
+    per-row method calls and attribute lookups. Timestamps stay datetimes; the
+    response serializer formats them in its single encoding pass.
+    """
+    return [
+        {
+            'id': model_set_id,
+            'name': name,
+            'description': description,
+            'type': model_set_type,
+            'config': _masked_config(model_set_type, config),
+            'created_at': created_at,
+            'updated_at': updated_at,
+            'created_by': created_by,
+        }
+        for model_set_id, name, description, model_set_type, config, created_at, updated_at, created_by, *_ in rows
+    ]
+
 
 class ModelSetService:
     """Service for managing model sets"""
     
+    # Threads for blocking AutoGen calls made while debugging llm_model sets
+    _llm_executor = ThreadPoolExecutor(max_workers=16, thread_name_prefix="autogen-debug")
+    
     def __init__(self, db: Session):
         self.db = db
     
-    def get_all_model_sets(self, skip: int = 0, limit: int = 100, name: Optional[str] = None) -> tuple[List[Dict[str, Any]], int]:
+    @functools.cached_property
+    def llm_service(self):
+        """LLMService bound to this service's session, created on first use"""
+        # Imported here so importing this module doesn't pull in the autogen provider
+        from app.services.llm_service import LLMService
+        return LLMService(self.db)
+    
+    def get_all_model_sets(
+        self,
+        skip: int = 0,
+        limit: int = 100,
+        name: Optional[str] = None,
+        after_id: Optional[int] = None,
+        include_total: bool = True,
+        name_prefix: bool = False,
+    ) -> tuple[List[Dict[str, Any]], Optional[int], Optional[int]]:
         """
         Get all model sets with pagination and search
         
         Args:
-            skip: Number of records to skip
+            skip: Number of records to skip (deprecated: offset paging scans every
+                skipped row; use after_id instead)
             limit: Maximum number of records to return
-            name: Optional search term for name (partial match)
+            name: Optional search term for name (partial match, case-insensitive)
+            after_id: Keyset cursor; return model sets with id greater than this
+                (takes precedence over skip)
+            include_total: Whether to compute the total count. It is never computed
+                for cursor pages (the first page already reported it)
+            name_prefix: Match only names starting with the search term, which
+                MySQL can serve from the name index
         
         Returns:
-            Tuple of (list of model sets, total count)
+            Tuple of (list of model sets, total count or None, next cursor). The
+            cursor is the last returned id, or None when there are no more pages
         """
-        # Build query with optional name filter
-        query = self.db.query(ModelSet)
+        name = name or None
+        filters = []
         if name:
-            query = query.filter(ModelSet.name.ilike(f'%{name}%'))
-        
-        # Get total count
-        total = query.count()
+            filters.append(name_search_clause(self.db, ModelSet.name, name, prefix=name_prefix))
+        total_key = (name, bool(name and name_prefix))
         
-        # Get paginated results
-        model_sets = query.order_by(ModelSet.id.asc()).offset(skip).limit(limit).all()
+        total = None
+        if after_id is not None:
+            # Keyset page: the primary key index seeks straight to the cursor, so
+            # the cost doesn't grow with page depth
+            rows = self.db.execute(
+                select(*_LIST_COLUMNS)
+                .where(*filters, ModelSet.id > after_id)
+                .order_by(ModelSet.id.asc())
+                .limit(limit)
+            ).all()
+        else:
+            total = _get_cached_total(total_key) if include_total else None
+            if include_total and total is None and supports_window_functions(self.db):
+                # Fetch the page as plain rows (only the needed columns, no ORM hydration,
+                # so nothing can lazy-load per row); the total is computed in the same
+                # statement with a window function
+                rows = self.db.execute(
+                    select(*_LIST_COLUMNS, func.count().over().label('total'))
+                    .where(*filters)
+                    .order_by(ModelSet.id.asc())
+                    .offset(skip)
+                    .limit(limit)
+                ).all()
+                
+                if rows:
+                    total = rows[0].total
+                elif skip or not limit:
+                    # Page past the end (or limit=0): no row carries the total, count separately
+                    total = self.db.execute(
+                        select(func.count()).select_from(ModelSet).where(*filters)
+                    ).scalar()
+                else:
+                    total = 0
+                _cache_total(total_key, total)
+            else:
+                rows = self.db.execute(
+                    select(*_LIST_COLUMNS)
+                    .where(*filters)
+                    .order_by(ModelSet.id.asc())
+                    .offset(skip)
+                    .limit(limit)
+                ).all()
+                if include_total and total is None:
+                    # MySQL 5.7 has no window functions: count separately
+                    total = self.db.execute(
+                        select(func.count()).select_from(ModelSet).where(*filters)
+                    ).scalar()
+                    _cache_total(total_key, total)
         
-        result = []
-        for model_set in model_sets:
-            result.append(self._model_set_to_dict(model_set))
+        result = _model_set_rows_to_dicts(rows)
+        next_cursor = rows[-1].id if rows and len(rows) == limit else None
         
-        return result, total
+        return result, total, next_cursor
     
     def get_model_set_by_id(self, model_set_id: int) -> Optional[Dict[str, Any]]:
         """
@@ -60,7 +519,7 @@ class ModelSetService:
         Returns:
             Model set dictionary or None
         """
-        model_set = self.db.query(ModelSet).filter(ModelSet.id == model_set_id).first()
+        model_set = self.db.get(ModelSet, model_set_id)
         
         if not model_set:
             return None
@@ -86,17 +545,7 @@ class ModelSetService:
                 'errors': validation_errors
             }
         
-        # Check if name already exists
-        existing = self.db.query(ModelSet).filter(
-            ModelSet.name == model_set_data['name']
-        ).first()
-        
-        if existing:
-            return {
-                'success': False,
-                'message': f'Model set name "{model_set_data["name"]}" already exists'
-            }
-        
+        # name uniqueness is enforced by the unique index (see IntegrityError below)
         try:
             # Encrypt API key in config if present
             config = model_set_data['config'].copy() if model_set_data.get('config') else {}
@@ -114,8 +563,9 @@ class ModelSetService:
             self.db.add(model_set)
             self.db.commit()
             self.db.refresh(model_set)
+            _TOTAL_CACHE.clear()
             
-            logger.info(f"Model set created: {model_set.name}")
+            logger.info("Model set created: %s", model_set.name)
             return {
                 'success': True,
                 'message': 'Model set created successfully',
@@ -123,14 +573,19 @@ class ModelSetService:
             }
         except IntegrityError as e:
             self.db.rollback()
-            logger.error(f"Failed to create model set: {str(e)}")
+            if is_unique_violation(e):
+                return {
+                    'success': False,
+                    'message': f'Model set name "{model_set_data.get("name")}" already exists'
+                }
+            logger.error("Failed to create model set: %s", e)
             return {
                 'success': False,
                 'message': f'Failed to create model set: {str(e)}'
             }
         except Exception as e:
             self.db.rollback()
-            logger.error(f"Failed to create model set: {str(e)}")
+            logger.error("Failed to create model set: %s", e)
             return {
                 'success': False,
                 'message': f'Failed to create model set: {str(e)}'
@@ -147,7 +602,7 @@ class ModelSetService:
         Returns:
             Result dictionary with success status and message
         """
-        model_set = self.db.query(ModelSet).filter(ModelSet.id == model_set_id).first()
+        model_set = self.db.get(ModelSet, model_set_id)
         
         if not model_set:
             return {
@@ -156,7 +611,7 @@ class ModelSetService:
             }
         
         # Validate required fields
-        validation_errors = self.validate_model_set(model_set_data, exclude_id=model_set_id)
+        validation_errors = self.validate_model_set(model_set_data)
         if validation_errors:
             return {
                 'success': False,
@@ -164,19 +619,7 @@ class ModelSetService:
                 'errors': validation_errors
             }
         
-        # Check if name already exists (excluding current model set)
-        if 'name' in model_set_data:
-            existing = self.db.query(ModelSet).filter(
-                ModelSet.name == model_set_data['name'],
-                ModelSet.id != model_set_id
-            ).first()
-            
-            if existing:
-                return {
-                    'success': False,
-                    'message': f'Model set name "{model_set_data["name"]}" already exists'
-                }
-        
+        # name uniqueness is enforced by the unique index (see IntegrityError below)
         try:
             # Update fields
             if 'name' in model_set_data:
@@ -200,25 +643,36 @@ class ModelSetService:
             if 'created_by' in model_set_data:
                 model_set.created_by = model_set_data.get('created_by')
             
+            # updated_at is set by the Python-side onupdate during flush, so the
+            # response can be built without a refresh SELECT after commit
+            self.db.flush()
+            data = self._model_set_to_dict(model_set)
             self.db.commit()
-            self.db.refresh(model_set)
+            _DEBUG_CONFIG_CACHE.clear()
+            if 'name' in model_set_data:
+                _TOTAL_CACHE.clear()
             
-            logger.info(f"Model set updated: {model_set.name}")
+            logger.info("Model set updated: %s", data['name'])
             return {
                 'success': True,
                 'message': 'Model set updated successfully',
-                'data': self._model_set_to_dict(model_set)
+                'data': data
             }
         except IntegrityError as e:
             self.db.rollback()
-            logger.error(f"Failed to update model set: {str(e)}")
+            if is_unique_violation(e):
+                return {
+                    'success': False,
+                    'message': f'Model set name "{model_set_data.get("name")}" already exists'
+                }
+            logger.error("Failed to update model set: %s", e)
             return {
                 'success': False,
                 'message': f'Failed to update model set: {str(e)}'
             }
         except Exception as e:
             self.db.rollback()
-            logger.error(f"Failed to update model set: {str(e)}")
+            logger.error("Failed to update model set: %s", e)
             return {
                 'success': False,
                 'message': f'Failed to update model set: {str(e)}'
@@ -234,27 +688,32 @@ class ModelSetService:
         Returns:
             Result dictionary with success status and message
         """
-        model_set = self.db.query(ModelSet).filter(ModelSet.id == model_set_id).first()
+        # Only the name is needed for the response message; delete with a single
+        # DELETE statement instead of loading the full row into the session
+        model_set_name = self.db.execute(
+            select(ModelSet.name).where(ModelSet.id == model_set_id)
+        ).scalar()
         
-        if not model_set:
+        if model_set_name is None:
             return {
                 'success': False,
                 'message': 'Model set not found'
             }
         
         try:
-            model_set_name = model_set.name
-            self.db.delete(model_set)
+            self.db.execute(delete(ModelSet).where(ModelSet.id == model_set_id))
             self.db.commit()
+            _DEBUG_CONFIG_CACHE.clear()
+            _TOTAL_CACHE.clear()
             
-            logger.info(f"Model set deleted: {model_set_name}")
+            logger.info("Model set deleted: %s", model_set_name)
             return {
                 'success': True,
                 'message': f'Model set "{model_set_name}" deleted successfully'
             }
         except Exception as e:
             self.db.rollback()
-            logger.error(f"Failed to delete model set: {str(e)}")
+            logger.error("Failed to delete model set: %s", e)
             return {
                 'success': False,
                 'message': f'Failed to delete model set: {str(e)}'
@@ -271,7 +730,11 @@ class ModelSetService:
         Returns:
             Debug result dictionary
         """
-        model_set = self.db.query(ModelSet).filter(ModelSet.id == model_set_id).first()
+        # Read the small columns first; the JSON config is only loaded and
+        # decrypted when this version of the model set isn't cached yet
+        model_set = self.db.execute(
+            select(ModelSet.type, ModelSet.updated_at).where(ModelSet.id == model_set_id)
+        ).first()
         
         if not model_set:
             return {
@@ -280,30 +743,62 @@ class ModelSetService:
             }
         
         try:
+            config, template_paths = self._get_debug_config(model_set_id, model_set.updated_at)
             if model_set.type == 'agent_api':
-                return await self._debug_agent_api(model_set.config, test_data)
+                return await self._debug_agent_api(config, test_data, template_paths)
             elif model_set.type == 'llm_model':
-                return await self._debug_model(model_set.config, test_data)
+                return await self._debug_model(config, test_data)
             else:
                 return {
                     'success': False,
                     'message': f'Unknown model set type: {model_set.type}'
                 }
         except Exception as e:
-            logger.error(f"Failed to debug model set: {str(e)}")
+            logger.error("Failed to debug model set: %s", e)
             return {
                 'success': False,
                 'message': f'Debug failed: {str(e)}',
                 'error': str(e)
             }
     
-    async def _debug_agent_api(self, config: Dict[str, Any], test_data: Dict[str, Any]) -> Dict[str, Any]:
+    def _get_debug_config(self, model_set_id: int, updated_at: Any) -> tuple:
+        """
+        Get a model set's config with its API key decrypted, using the debug cache
+        
+        Args:
+            model_set_id: Model set ID
+            updated_at: Current updated_at of the model set (cache version)
+            
+        Returns:
+            Tuple of (config dictionary, compiled api_body_template paths).
+            The config is a shared cache entry and must not be mutated
+        """
+        cache_key = (model_set_id, updated_at)
+        entry = _DEBUG_CONFIG_CACHE.get(cache_key)
+        if entry is not None:
+            _DEBUG_CONFIG_CACHE.move_to_end(cache_key)
+            return entry
+        
+        config = dict(self.db.execute(
+            select(ModelSet.config).where(ModelSet.id == model_set_id)
+        ).scalar() or {})
+        if config.get('api_key'):
+            config['api_key'] = decrypt_api_key(config['api_key'])
+        
+        entry = (config, _compile_template(config.get('api_body_template') or {}))
+        _DEBUG_CONFIG_CACHE[cache_key] = entry
+        if len(_DEBUG_CONFIG_CACHE) > _DEBUG_CONFIG_CACHE_SIZE:
+            _DEBUG_CONFIG_CACHE.popitem(last=False)
+        return entry
+    
+    async def _debug_agent_api(self, config: Dict[str, Any], test_data: Dict[str, Any], template_paths: Optional[tuple] = None) -> Dict[str, Any]:
         """
         Debug agent API by making HTTP request
         
         Args:
             config: Agent API configuration
             test_data: Test data
+            template_paths: api_body_template compiled by _compile_template (optional)
             
         Returns:
             Debug result
@@ -314,10 +809,12 @@ class ModelSetService:
         api_body_template = config.get('api_body_template', {})
         input_mapping = config.get('input_mapping', {})
         
-        logger.info(f"[DebugAgentAPI] Starting debug with URL: {api_url}, method: {api_method}")
-        logger.info(f"[DebugAgentAPI] Test data keys: {list(test_data.keys())}")
-        logger.info(f"[DebugAgentAPI] Input mapping: {json.dumps(input_mapping, ensure_ascii=False)}")
-        logger.info(f"[DebugAgentAPI] API body template: {json.dumps(api_body_template, ensure_ascii=False, indent=2)}")
+        debug_enabled = logger.isEnabledFor(logging.DEBUG)
+        logger.info("[DebugAgentAPI] Starting debug with URL: %s, method: %s", api_url, api_method)
+        if debug_enabled:
+            logger.debug("[DebugAgentAPI] Test data keys: %s", list(test_data.keys()))
+            logger.debug("[DebugAgentAPI] Input mapping: %s", _json_dumps(input_mapping))
+            logger.debug("[DebugAgentAPI] API body template: %s", _json_dumps(api_body_template, indent=True))
         
         if not api_url:
             logger.error("[DebugAgentAPI] API URL is required but not provided")
@@ -326,345 +823,159 @@ class ModelSetService:
                 'message': 'API URL is required'
             }
         
-        # Map test data to API body using input_mapping
-        mapped_data = {}
+        # Map test data to API body using input_mapping (if no mapping, use test_data directly)
         if input_mapping:
-            for api_key, test_key in input_mapping.items():
-                if test_key in test_data:
-                    mapped_data[api_key] = test_data[test_key]
+            mapped_data = {
+                api_key: test_data[test_key]
+                for api_key, test_key in input_mapping.items()
+                if test_key in test_data
+            }
         else:
-            # If no mapping, use test_data directly
             mapped_data = test_data
         
-        # Build request body from template using JSON string replacement
-        # This approach handles nested structures correctly (e.g., param_map.content)
+        # Build request body by substituting placeholders on the template objects
+        # (handles nested structures, e.g. param_map.content)
         if api_body_template:
-            logger.info(f"[DebugAgentAPI] Processing api_body_template with mapped_data keys: {list(mapped_data.keys())}")
-            # Convert template to JSON string
-            body_str = json.dumps(api_body_template, ensure_ascii=False)
-            logger.info(f"[DebugAgentAPI] Template JSON string (before replacement): {body_str}")
-            logger.info(f"[DebugAgentAPI] Mapped data values: {json.dumps({k: str(v)[:100] + '...' if len(str(v)) > 100 else str(v) for k, v in mapped_data.items()}, ensure_ascii=False)}")
+            if template_paths is not None:
+                api_body = _apply_compiled_template(api_body_template, template_paths, mapped_data)
+            else:
+                api_body = _substitute(api_body_template, mapped_data)
+        else:
+            # If no template, use mapped_data directly
+            api_body = mapped_data
+            logger.debug("[DebugAgentAPI] No template, using mapped_data directly")
+        
+        # Log the final request details before sending
+        logger.info("[DebugAgentAPI] Sending %s request to %s", api_method, api_url)
+        if debug_enabled:
+            logger.debug("[DebugAgentAPI] Request headers: %s", _json_dumps(api_headers, indent=True))
+            logger.debug("[DebugAgentAPI] Request body: %s", _json_dumps(api_body, indent=True))
+        
+        try:
+            method = api_method.upper()
+            body_param = _HTTP_METHOD_BODY_PARAMS.get(method)
+            if body_param is None:
+                logger.error("[DebugAgentAPI] Unsupported HTTP method: %s", api_method)
+                return {
+                    'success': False,
+                    'message': f'Unsupported HTTP method: {api_method}'
+                }
             
-            # Replace placeholders with actual values
-            # The placeholder is inside a JSON string value, so we need to replace it carefully
-            # For example: "content": "{content}" should become "content": "actual value"
-            # json.dumps() adds quotes for strings, but since the placeholder is already inside quotes,
-            # we need to remove the outer quotes from json.dumps() result for strings
-            # 
-            # IMPORTANT: We need to detect if the placeholder is inside quotes or not
-            # - If inside quotes: escape the string and remove outer quotes from json.dumps() result
-            # - If not inside quotes: use json.dumps() result directly (for JSON objects/values)
-            def _find_placeholder_context(json_str: str, placeholder: str) -> tuple:
-                """
-                Find placeholder in JSON string and determine if it's inside quotes.
-                Returns: (is_inside_quotes, position)
-                """
-                pos = json_str.find(placeholder)
-                if pos == -1:
-                    return False, -1
-                
-                # Check if we're inside a string value (between quotes)
-                # Count unescaped quotes before the placeholder
-                quote_count = 0
-                escaped = False
-                for i in range(pos):
-                    char = json_str[i]
-                    if escaped:
-                        escaped = False
-                        continue
-                    if char == '\\':
-                        escaped = True
-                        continue
-                    if char == '"':
-                        quote_count += 1
-                
-                # If odd number of quotes before placeholder, we're inside a string
-                is_inside_quotes = (quote_count % 2 == 1)
-                return is_inside_quotes, pos
+            client = get_http_client()
+            request = client.build_request(method, api_url, headers=api_headers, **{body_param: api_body})
             
-            for key, value in mapped_data.items():
-                placeholder = f"{{{key}}}"
-                if placeholder in body_str:
-                    logger.info(f"[DebugAgentAPI] Replacing placeholder {placeholder} with value type: {type(value).__name__}")
-                    
-                    # Find all occurrences of the placeholder
-                    placeholder_positions = []
-                    start = 0
-                    while True:
-                        pos = body_str.find(placeholder, start)
-                        if pos == -1:
-                            break
-                        placeholder_positions.append(pos)
-                        start = pos + 1
-                    
-                    # Replace from end to start to maintain positions
-                    for pos in reversed(placeholder_positions):
-                        # Check context for this occurrence
-                        is_inside_quotes, _ = _find_placeholder_context(body_str[:pos + len(placeholder)], placeholder)
-                        
-                        if isinstance(value, str):
-                            if is_inside_quotes:
-                                # Placeholder is inside quotes - escape the string and remove outer quotes
-                                escaped_json = json.dumps(value, ensure_ascii=False)
-                                # Remove outer quotes: "value" -> value (but properly escaped)
-                                if len(escaped_json) >= 2 and escaped_json[0] == '"' and escaped_json[-1] == '"':
-                                    escaped_value = escaped_json[1:-1]
-                                else:
-                                    escaped_value = escaped_json
-                                logger.info(f"[DebugAgentAPI] Placeholder in quotes - escaped value (first 200 chars): {escaped_value[:200]}...")
-                            else:
-                                # Placeholder is NOT in quotes - treat as JSON value
-                                # If value looks like JSON, try to parse and use as object
-                                value_stripped = value.strip()
-                                if (value_stripped.startswith('{') and value_stripped.endswith('}')) or \
-                                   (value_stripped.startswith('[') and value_stripped.endswith(']')):
-                                    try:
-                                        # Value is JSON - parse it and use json.dumps() to get proper JSON representation
-                                        parsed_value = json.loads(value)
-                                        escaped_value = json.dumps(parsed_value, ensure_ascii=False)
-                                        logger.info(f"[DebugAgentAPI] Placeholder not in quotes - parsed JSON value")
-                                    except (json.JSONDecodeError, ValueError):
-                                        # Not valid JSON, escape as string
-                                        escaped_json = json.dumps(value, ensure_ascii=False)
-                                        escaped_value = escaped_json
-                                        logger.info(f"[DebugAgentAPI] Placeholder not in quotes - value not valid JSON, escaped as string")
-                                else:
-                                    # Not JSON-like, escape as string
-                                    escaped_json = json.dumps(value, ensure_ascii=False)
-                                    escaped_value = escaped_json
-                                    logger.info(f"[DebugAgentAPI] Placeholder not in quotes - escaped as string")
-                            
-                            # Replace this occurrence
-                            body_str = body_str[:pos] + escaped_value + body_str[pos + len(placeholder):]
-                        else:
-                            # For non-string values (dict, list, numbers, booleans, null)
-                            # Need to check if placeholder is inside quotes
-                            if is_inside_quotes:
-                                # Placeholder is inside quotes - need to escape the JSON string
-                                # Serialize the value to JSON, then escape it as a string
-                                value_json = json.dumps(value, ensure_ascii=False)
-                                # Escape the JSON string and remove outer quotes
-                                escaped_json = json.dumps(value_json, ensure_ascii=False)
-                                if len(escaped_json) >= 2 and escaped_json[0] == '"' and escaped_json[-1] == '"':
-                                    escaped_value = escaped_json[1:-1]
-                                else:
-                                    escaped_value = escaped_json
-                                logger.info(f"[DebugAgentAPI] Non-string value in quotes - escaped JSON (first 200 chars): {escaped_value[:200]}...")
-                                body_str = body_str[:pos] + escaped_value + body_str[pos + len(placeholder):]
-                            else:
-                                # Placeholder is NOT in quotes - use JSON directly
-                                # For numbers, booleans, null, json.dumps() returns the value directly
-                                # For dict/list, json.dumps() returns the JSON object representation
-                                value_json = json.dumps(value, ensure_ascii=False)
-                                logger.info(f"[DebugAgentAPI] Non-string value not in quotes - JSON: {value_json[:200] if len(value_json) > 200 else value_json}...")
-                                body_str = body_str[:pos] + value_json + body_str[pos + len(placeholder):]
+            # Stream the body so an oversized upstream response is rejected
+            # instead of being buffered and parsed in full
+            max_bytes = settings.DEBUG_MAX_RESPONSE_BYTES
+            response = await client.send(request, stream=True)
+            try:
+                content = await _read_response_body(response, max_bytes)
+            finally:
+                await response.aclose()
             
-            logger.info(f"[DebugAgentAPI] Template JSON string (after replacement): {body_str}")
+            logger.info("[DebugAgentAPI] Response status: %s", response.status_code)
             
-            # Parse the final JSON string back to dict
-            try:
-                api_body = json.loads(body_str)
-                logger.info(f"[DebugAgentAPI] Final api_body keys: {list(api_body.keys()) if isinstance(api_body, dict) else 'not a dict'}")
-                
-                # Post-process: If a field value is a JSON string but should be an object, parse it
-                # Common field names that typically expect JSON objects: paramMap, params, parameters, data, body, etc.
-                json_object_fields = ['paramMap', 'params', 'parameters', 'data', 'body', 'input', 'inputs', 'inputs_content', 'content']
-                if isinstance(api_body, dict):
-                    # First, check known field names
-                    for field_name in json_object_fields:
-                        if field_name in api_body and isinstance(api_body[field_name], str):
-                            try:
-                                parsed = json.loads(api_body[field_name])
-                                logger.info(f"[DebugAgentAPI] Parsed {field_name} from JSON string to object")
-                                api_body[field_name] = parsed
-                            except (json.JSONDecodeError, ValueError):
-                                # Not a valid JSON string, keep as is
-                                logger.debug(f"[DebugAgentAPI] Field {field_name} is not a valid JSON string, keeping as is")
-                                pass
-                    
-                    # Then, check all string fields that look like JSON
-                    # This helps catch fields that might be JSON strings but aren't in the known list
-                    for field_name, field_value in api_body.items():
-                        if isinstance(field_value, str) and field_name not in json_object_fields:
-                            # Check if the string looks like JSON (starts with { or [)
-                            stripped = field_value.strip()
-                            if (stripped.startswith('{') and stripped.endswith('}')) or \
-                               (stripped.startswith('[') and stripped.endswith(']')):
-                                try:
-                                    parsed = json.loads(field_value)
-                                    logger.info(f"[DebugAgentAPI] Parsed {field_name} (detected as JSON string) from JSON string to object")
-                                    api_body[field_name] = parsed
-                                except (json.JSONDecodeError, ValueError):
-                                    # Not a valid JSON string, keep as is
-                                    logger.debug(f"[DebugAgentAPI] Field {field_name} looks like JSON but is not valid, keeping as is")
-                                pass
-                
-                logger.info(f"[DebugAgentAPI] Final api_body: {json.dumps(api_body, ensure_ascii=False, indent=2)}")
-            except json.JSONDecodeError as e:
-                logger.error(f"[DebugAgentAPI] Failed to parse api_body_template after replacement: {e}")
-                logger.error(f"[DebugAgentAPI] JSON decode error at position {e.pos}: {e.msg}")
-                logger.error(f"[DebugAgentAPI] Original template: {json.dumps(api_body_template, ensure_ascii=False, indent=2)}")
-                logger.error(f"[DebugAgentAPI] Mapped data keys: {list(mapped_data.keys())}")
-                logger.error(f"[DebugAgentAPI] Mapped data types: {[(k, type(v).__name__, str(v)[:100] + '...' if len(str(v)) > 100 else str(v)) for k, v in mapped_data.items()]}")
-                logger.error(f"[DebugAgentAPI] Invalid JSON string (first 500 chars): {body_str[:500]}")
-                logger.error(f"[DebugAgentAPI] Invalid JSON string (around error position): {body_str[max(0, e.pos-50):e.pos+50] if e.pos else 'N/A'}")
-                logger.error(f"[DebugAgentAPI] Invalid JSON string (full length): {len(body_str)} chars")
-                
-                # Try to provide more helpful error message
-                error_context = body_str[max(0, e.pos-50):e.pos+50] if e.pos else ''
-                error_msg = (
-                    f'Invalid api_body_template after placeholder replacement: {str(e)}. '
-                    f'Error at position {e.pos}: {e.msg}. '
-                    f'Context: {error_context}. '
-                    f'This usually happens when a placeholder value contains JSON that breaks the template structure. '
-                    f'Check if placeholder values need to be escaped or if the template structure is correct.'
-                )
-                logger.error(f"[DebugAgentAPI] {error_msg}")
+            if content is None:
+                error_msg = f'Response body exceeds {max_bytes} bytes'
+                logger.error("[DebugAgentAPI] %s", error_msg)
                 return {
                     'success': False,
                     'message': error_msg,
-                    'error_details': {
-                        'json_error': str(e),
-                        'error_position': e.pos,
-                        'error_message': e.msg,
-                        'template_before': json.dumps(api_body_template, ensure_ascii=False, indent=2),
-                        'json_after_first_500': body_str[:500],
-                        'json_after_around_error': body_str[max(0, e.pos-50):e.pos+50] if e.pos else 'N/A',
-                        'mapped_data_keys': list(mapped_data.keys()),
-                        'mapped_data_types': [(k, type(v).__name__) for k, v in mapped_data.items()]
-                    }
+                    'status_code': response.status_code
                 }
-        else:
-            # If no template, use mapped_data directly
-            api_body = mapped_data
-            logger.info(f"[DebugAgentAPI] No template, using mapped_data directly. Keys: {list(api_body.keys())}")
-        
-        # Log the final request details before sending
-        logger.info(f"[DebugAgentAPI] Sending {api_method} request to {api_url}")
-        logger.debug(f"[DebugAgentAPI] Request headers: {json.dumps(api_headers, ensure_ascii=False, indent=2)}")
-        logger.debug(f"[DebugAgentAPI] Request body: {json.dumps(api_body, ensure_ascii=False, indent=2)}")
-        
-        try:
-            async with httpx.AsyncClient(timeout=60.0) as client:
-                if api_method.upper() == 'POST':
-                    response = await client.post(api_url, json=api_body, headers=api_headers)
-                elif api_method.upper() == 'GET':
-                    response = await client.get(api_url, params=api_body, headers=api_headers)
-                elif api_method.upper() == 'PUT':
-                    response = await client.put(api_url, json=api_body, headers=api_headers)
-                elif api_method.upper() == 'PATCH':
-                    response = await client.patch(api_url, json=api_body, headers=api_headers)
-                else:
-                    logger.error(f"[DebugAgentAPI] Unsupported HTTP method: {api_method}")
+            
+            encoding = response.encoding or 'utf-8'
+            
+            # Parse response body first (before checking HTTP status)
+            # This allows us to check for business-level errors even when HTTP status is 200
+            try:
+                result = _json_loads(content) if response.headers.get('content-type', '').startswith('application/json') else content.decode(encoding, errors='replace')
+            except Exception as parse_error:
+                # If response body parsing fails, check HTTP status
+                if not (200 <= response.status_code < 300):
+                    error_msg = f'HTTP {response.status_code} error: Failed to parse response body'
+                    logger.error("[DebugAgentAPI] %s", error_msg)
+                    logger.error("[DebugAgentAPI] Error response body: %s", content[:2000].decode(encoding, errors='replace'))
                     return {
                         'success': False,
-                        'message': f'Unsupported HTTP method: {api_method}'
+                        'message': error_msg,
+                        'error': str(parse_error),
+                        'status_code': response.status_code,
+                        'response': content[:500].decode(encoding, errors='replace')
                     }
+                # If HTTP status is 2xx but parsing failed, return error
+                logger.error("[DebugAgentAPI] Failed to parse response body: %s", parse_error)
+                return {
+                    'success': False,
+                    'message': f'Failed to parse response body: {str(parse_error)}',
+                    'error': str(parse_error),
+                    'status_code': response.status_code,
+                    'response': content[:500].decode(encoding, errors='replace')
+                }
+            
+            # Check for business-level errors in response (even if HTTP status is 200)
+            # Some APIs return HTTP 200 but include error codes in the response body
+            if isinstance(result, dict):
+                error_code = result.get('code')
+                error_msg = result.get('msg') or result.get('message')
                 
-                logger.info(f"[DebugAgentAPI] Response status: {response.status_code}")
-                
-                # Parse response body first (before checking HTTP status)
-                # This allows us to check for business-level errors even when HTTP status is 200
-                try:
-                    result = response.json() if response.headers.get('content-type', '').startswith('application/json') else response.text
-                except Exception as parse_error:
-                    # If response body parsing fails, check HTTP status
-                    if not (200 <= response.status_code < 300):
-                        error_msg = f'HTTP {response.status_code} error: Failed to parse response body'
-                        logger.error(f"[DebugAgentAPI] {error_msg}")
-                        return {
-                            'success': False,
-                            'message': error_msg,
-                            'error': str(parse_error),
-                            'status_code': response.status_code,
-                            'response': response.text[:500] if hasattr(response, 'text') else None
-                        }
-                    # If HTTP status is 2xx but parsing failed, return error
-                    logger.error(f"[DebugAgentAPI] Failed to parse response body: {str(parse_error)}")
+                # Check if response indicates an error (common patterns: code != 0, code >= 4000, or has error message)
+                if error_code is not None and (error_code != 0 and error_code != 200):
+                    logger.error("[DebugAgentAPI] Business error in response: code=%s, msg=%s, keys=%s", error_code, error_msg, list(result)[:20])
+                    if debug_enabled:
+                        logger.debug("[DebugAgentAPI] Response (first 2000 bytes): %s", _json_preview(result, 2000))
                     return {
                         'success': False,
-                        'message': f'Failed to parse response body: {str(parse_error)}',
-                        'error': str(parse_error),
+                        'message': f'API returned business error: {error_msg or f"Error code {error_code}"}',
+                        'response': result,
                         'status_code': response.status_code,
-                        'response': response.text[:500] if hasattr(response, 'text') else None
+                        'error_code': error_code,
+                        'error_message': error_msg
                     }
-                
-                # Check for business-level errors in response (even if HTTP status is 200)
-                # Some APIs return HTTP 200 but include error codes in the response body
-                if isinstance(result, dict):
-                    error_code = result.get('code')
-                    error_msg = result.get('msg') or result.get('message')
-                    
-                    # Check if response indicates an error (common patterns: code != 0, code >= 4000, or has error message)
-                    if error_code is not None and (error_code != 0 and error_code != 200):
-                        logger.error(f"[DebugAgentAPI] Business error in response: code={error_code}, msg={error_msg}")
-                        logger.error(f"[DebugAgentAPI] Full response: {json.dumps(result, ensure_ascii=False)}")
-                        return {
-                            'success': False,
-                            'message': f'API returned business error: {error_msg or f"Error code {error_code}"}',
-                            'response': result,
-                            'status_code': response.status_code,
-                            'error_code': error_code,
-                            'error_message': error_msg
-                        }
-                    elif error_msg and ('error' in error_msg.lower() or '异常' in error_msg or '失败' in error_msg):
-                        # Also check for error keywords in message
-                        logger.error(f"[DebugAgentAPI] Error message detected in response: {error_msg}")
-                        logger.error(f"[DebugAgentAPI] Full response: {json.dumps(result, ensure_ascii=False)}")
-                        return {
-                            'success': False,
-                            'message': f'API returned error: {error_msg}',
-                            'response': result,
-                            'status_code': response.status_code,
-                            'error_message': error_msg
-                        }
-                
-                # If no business errors detected, check HTTP status code
-                if not (200 <= response.status_code < 300):
-                    error_msg = f'HTTP {response.status_code} error'
-                    logger.error(f"[DebugAgentAPI] {error_msg}")
+                elif isinstance(error_msg, str) and _ERROR_KEYWORDS_RE.search(error_msg):
+                    # Also check for error keywords in message
+                    logger.error("[DebugAgentAPI] Error message detected in response: %s, keys=%s", error_msg, list(result)[:20])
+                    if debug_enabled:
+                        logger.debug("[DebugAgentAPI] Response (first 2000 bytes): %s", _json_preview(result, 2000))
                     return {
                         'success': False,
-                        'message': error_msg,
+                        'message': f'API returned error: {error_msg}',
+                        'response': result,
                         'status_code': response.status_code,
-                        'response': result
-                        }
-                
-                logger.info(f"[DebugAgentAPI] Request successful, response: {json.dumps(result, ensure_ascii=False)[:500]}...")
+                        'error_message': error_msg
+                    }
+            
+            # If no business errors detected, check HTTP status code
+            if not (200 <= response.status_code < 300):
+                error_msg = f'HTTP {response.status_code} error'
+                # Log the raw bytes (capped) rather than re-encoding the parsed body
+                logger.error("[DebugAgentAPI] %s", error_msg)
+                logger.error("[DebugAgentAPI] Error response body: %s", content[:2000].decode(encoding, errors='replace'))
                 return {
-                    'success': True,
-                    'message': 'Debug successful',
-                    'response': result,
-                    'status_code': response.status_code
-                }
-        except httpx.HTTPStatusError as e:
-            # HTTP error with status code
-            error_msg = f'HTTP {e.response.status_code} error: {str(e)}'
-            try:
-                error_body = e.response.json() if e.response.headers.get('content-type', '').startswith('application/json') else e.response.text
-                logger.error(f"[DebugAgentAPI] {error_msg}")
-                logger.error(f"[DebugAgentAPI] Error response body: {json.dumps(error_body, ensure_ascii=False) if isinstance(error_body, dict) else error_body}")
-            except:
-                logger.error(f"[DebugAgentAPI] {error_msg}")
-                logger.error(f"[DebugAgentAPI] Error response text: {e.response.text[:500]}")
+                    'success': False,
+                    'message': error_msg,
+                    'status_code': response.status_code,
+                    'response': result
+                    }
             
+            if debug_enabled:
+                logger.debug("[DebugAgentAPI] Request successful, response: %s...", _json_preview(result, 500))
             return {
-                'success': False,
-                'message': error_msg,
-                'error': str(e),
-                'status_code': e.response.status_code,
-                'response': error_body if 'error_body' in locals() else None
+                'success': True,
+                'message': 'Debug successful',
+                'response': result,
+                'status_code': response.status_code
             }
         except httpx.HTTPError as e:
             # Network or other HTTP errors
-            logger.error(f"[DebugAgentAPI] HTTP error: {str(e)}")
+            logger.error("[DebugAgentAPI] HTTP error: %s", e)
             return {
                 'success': False,
                 'message': f'HTTP error: {str(e)}',
                 'error': str(e)
             }
         except Exception as e:
-            logger.error(f"[DebugAgentAPI] Request failed: {str(e)}", exc_info=True)
+            logger.error("[DebugAgentAPI] Request failed: %s", e, exc_info=True)
             return {
                 'success': False,
                 'message': f'Request failed: {str(e)}',
@@ -698,17 +1009,25 @@ class ModelSetService:
             prompt_text = test_data['prompt']
         elif messages:
             # Convert messages to a single prompt text (for fallback)
-            if len(messages) > 0:
-                prompt_parts = []
-                for msg in messages:
-                    role = msg.get('role', 'user') if isinstance(msg, dict) else 'user'
-                    content = msg.get('content', '') if isinstance(msg, dict) else str(msg)
-                    if role == 'user':
-                        prompt_parts.append(content)
-                    elif role == 'assistant':
-                        prompt_parts.append(f"Assistant: {content}")
-                    elif role == 'system':
-                        prompt_parts.append(f"System: {content}")
+            first = messages[0]
+            if (
+                len(messages) == 1
+                and isinstance(first, dict)
+                and first.get('role', 'user') == 'user'
+                and isinstance(first.get('content', ''), str)
+            ):
+                # Common case: a single user message is the prompt as-is
+                prompt_text = first.get('content', '')
+            else:
+                # Messages with other roles are skipped
+                prompt_parts = [
+                    f"{_ROLE_PREFIXES[role]}{content}"
+                    for role, content in (
+                        (msg.get('role', 'user'), msg.get('content', '')) if isinstance(msg, dict) else ('user', str(msg))
+                        for msg in messages
+                    )
+                    if role in _ROLE_PREFIXES
+                ]
                 prompt_text = '\n\n'.join(prompt_parts) if prompt_parts else str(messages)
         else:
             return {
@@ -717,14 +1036,12 @@ class ModelSetService:
             }
             
         if not prompt_text and not messages:
-            prompt_text = json.dumps(test_data, ensure_ascii=False)
+            prompt_text = _json_dumps(test_data)
         
         # Use LLMService if model_config_id is available
         if model_config_id:
-            logger.info(f"[DebugModel] Using LLMService with model_config_id={model_config_id}")
-            from app.services.llm_service import LLMService
-            
-            llm_service = LLMService(self.db)
+            logger.info("[DebugModel] Using LLMService with model_config_id=%s", model_config_id)
+            llm_service = self.llm_service
             
             # Get temperature, max_tokens, timeout from config (may override model_config defaults)
             temperature = config.get("temperature")
@@ -768,7 +1085,7 @@ class ModelSetService:
                     'model': llm_response.metadata.get('model', config.get('model_version', 'unknown')),
                 }
             except Exception as e:
-                logger.error(f"[DebugModel] LLMService invocation failed: {str(e)}", exc_info=True)
+                logger.error("[DebugModel] LLMService invocation failed: %s", e, exc_info=True)
                 return {
                     'success': False,
                     'message': f'LLM invocation error: {str(e)}',
@@ -781,96 +1098,37 @@ class ModelSetService:
             # Fallback to old AutoGen agent creation (for backward compatibility)
             logger.warning("[DebugModel] model_config_id not found in config, falling back to direct agent creation")
             
-            model_version = config.get('model_version')
-            encrypted_api_key = config.get('api_key')
-            
-            if not model_version or not encrypted_api_key:
-                return {
-                    'success': False,
-                    'message': 'Model version and API key are required'
-                }
-            
-            # Decrypt API key for internal use
-            api_key = decrypt_api_key(encrypted_api_key)
-            
             try:
-                # Ensure timeout is an integer (may come as string from JSON)
-                timeout_value = config.get('timeout', 120)
-                if isinstance(timeout_value, str):
-                    try:
-                        timeout_value = int(timeout_value)
-                    except (ValueError, TypeError):
-                        timeout_value = 120
-                elif not isinstance(timeout_value, int):
-                    timeout_value = int(timeout_value) if timeout_value is not None else 120
-                
-                # Ensure temperature is a float (may come as string from JSON)
-                temperature_value = config.get('temperature')
-                if temperature_value is not None:
-                    if isinstance(temperature_value, str):
-                        try:
-                            temperature_value = float(temperature_value)
-                        except (ValueError, TypeError):
-                            temperature_value = None
-                    elif not isinstance(temperature_value, (int, float)):
-                        try:
-                            temperature_value = float(temperature_value)
-                        except (ValueError, TypeError):
-                            temperature_value = None
-                
-                # Ensure max_tokens is an integer (may come as string from JSON)
-                max_tokens_value = config.get('max_tokens')
-                if max_tokens_value is not None:
-                    if isinstance(max_tokens_value, str):
-                        try:
-                            max_tokens_value = int(max_tokens_value)
-                        except (ValueError, TypeError):
-                            max_tokens_value = None
-                    elif not isinstance(max_tokens_value, int):
-                        try:
-                            max_tokens_value = int(max_tokens_value)
-                        except (ValueError, TypeError):
-                            max_tokens_value = None
+                # api_key was already decrypted by _get_debug_config
+                debug_config = _DebugModelConfig.model_validate(config)
                 
-                # Create autogen config from model config (supports qwen and all other model types)
-                # Import here to avoid circular import with autogen_helper
-                from app.utils.autogen_helper import create_autogen_config_from_model_config, _clear_agent_chat_messages
-                
-                model_config_dict = {
-                    "model_type": config.get('model_type', 'openai'),
-                    "model_version": model_version,
-                    "api_key": api_key,
-                    "api_base": config.get('api_base'),
-                    "temperature": temperature_value,
-                    "max_tokens": max_tokens_value,
-                    "timeout": timeout_value,
-                }
-                
-                autogen_config = create_autogen_config_from_model_config(model_config_dict)
-                
-                # Create AutoGen agent
-                agent = ConversableAgent(
-                    name="debug_agent",
-                    system_message="You are a helpful assistant. Respond to user requests directly and concisely.",
-                    llm_config=autogen_config,
-                    human_input_mode="NEVER",
-                    max_consecutive_auto_reply=1,
-                )
+                if not debug_config.model_version or not debug_config.api_key:
+                    return {
+                        'success': False,
+                        'message': 'Model version and API key are required'
+                    }
                 
-                # Clear chat history before generating reply
-                # This ensures each debug invocation is independent and doesn't reuse previous results
-                _clear_agent_chat_messages(agent)
+                base_url = debug_config.api_base or _OPENAI_COMPATIBLE_BASE_URLS.get((debug_config.model_type or '').lower())
+                if base_url:
+                    content, input_tokens, output_tokens = await self._debug_model_direct(debug_config, base_url, prompt_text)
+                    return {
+                        'success': True,
+                        'message': 'Debug successful',
+                        'response': content,
+                        'input_tokens': input_tokens,
+                        'output_tokens': output_tokens,
+                        'model': debug_config.model_version,
+                    }
                 
-                # Generate reply using AutoGen agent
+                # Unknown model type without api_base: let AutoGen resolve the endpoint
                 # Note: AutoGen's generate_reply is synchronous, but we're in async context
-                # We need to run it in a thread pool
-                loop = asyncio.get_event_loop()
-                
-                response = await loop.run_in_executor(
-                    None,
-                    lambda: agent.generate_reply(
-                        messages=[{"role": "user", "content": prompt_text}]
-                    )
+                # We need to run it in a thread pool (a dedicated one, so slow LLM calls
+                # don't occupy the loop's default executor)
+                response, (input_tokens, output_tokens) = await asyncio.get_running_loop().run_in_executor(
+                    self._llm_executor,
+                    _generate_debug_reply,
+                    debug_config,
+                    [{"role": "user", "content": prompt_text}],
                 )
                 
                 # Extract content from response
@@ -881,99 +1139,100 @@ class ModelSetService:
                 else:
                     content = str(response)
                 
-                # Try to extract token usage from agent's internal state
-                input_tokens = 0
-                output_tokens = 0
-                model_name = model_version
-                
-                try:
-                    # Try various ways to extract token usage from AutoGen agent
-                    if hasattr(agent, 'last_cost'):
-                        cost_info = agent.last_cost
-                        if isinstance(cost_info, dict):
-                            input_tokens = cost_info.get("input_tokens", 0) or cost_info.get("prompt_tokens", 0)
-                            output_tokens = cost_info.get("output_tokens", 0) or cost_info.get("completion_tokens", 0)
-                    
-                    if hasattr(agent, 'usage'):
-                        usage = agent.usage
-                        if isinstance(usage, dict):
-                            input_tokens = usage.get("input_tokens", 0) or usage.get("prompt_tokens", 0) or input_tokens
-                            output_tokens = usage.get("output_tokens", 0) or usage.get("completion_tokens", 0) or output_tokens
-                    
-                    if hasattr(agent, 'chat_messages'):
-                        messages = agent.chat_messages
-                        if messages and len(messages) > 0:
-                            last_message = messages[-1]
-                            if isinstance(last_message, dict) and "usage" in last_message:
-                                usage = last_message["usage"]
-                                if isinstance(usage, dict):
-                                    input_tokens = usage.get("input_tokens", 0) or usage.get("prompt_tokens", 0) or input_tokens
-                                    output_tokens = usage.get("output_tokens", 0) or usage.get("completion_tokens", 0) or output_tokens
-                except Exception as e:
-                    logger.warning(f"Failed to extract token usage from AutoGen agent: {str(e)}")
-                
                 return {
                     'success': True,
                     'message': 'Debug successful',
                     'response': content,
                     'input_tokens': input_tokens,
                     'output_tokens': output_tokens,
-                    'model': model_name,
+                    'model': debug_config.model_version,
                 }
             except Exception as e:
-                logger.error(f"Failed to debug model (fallback): {str(e)}", exc_info=True)
+                logger.error("Failed to debug model (fallback): %s", e, exc_info=True)
                 return {
                     'success': False,
                     'message': f'Model call failed: {str(e)}',
                     'error': str(e)
                 }
     
-    def _model_set_to_dict(self, model_set: ModelSet) -> Dict[str, Any]:
+    async def _debug_model_direct(self, debug_config: "_DebugModelConfig", base_url: str, prompt_text: str) -> tuple:
+        """
+        Make a single chat completion call to an OpenAI-compatible endpoint
+        
+        Sends the same request the debug AutoGen agent would, over the shared
+        async HTTP client, without building an agent or using a worker thread.
+        
+        Returns:
+            Tuple of (content, input_tokens, output_tokens)
+        """
+        body = {
+            "model": debug_config.model_version,
+            "messages": [
+                {"role": "system", "content": _DEBUG_SYSTEM_MESSAGE},
+                {"role": "user", "content": prompt_text},
+            ],
+            **_DEBUG_EXTRA_BODY,
+        }
+        if debug_config.temperature is not None:
+            body["temperature"] = debug_config.temperature
+        if debug_config.max_tokens is not None:
+            body["max_tokens"] = debug_config.max_tokens
+        
+        response = await get_http_client().post(
+            f"{base_url.rstrip('/')}/chat/completions",
+            json=body,
+            headers={"Authorization": f"Bearer {debug_config.api_key}"},
+            timeout=debug_config.timeout,
+        )
+        response.raise_for_status()
+        
+        result = _json_loads(response.content)
+        content = result["choices"][0]["message"].get("content") or ""
+        usage = result.get("usage") or {}
+        return content, usage.get("prompt_tokens", 0), usage.get("completion_tokens", 0)
+    
+    def _model_set_to_dict(self, model_set: Any) -> Dict[str, Any]:
         """
         Convert ModelSet model to dictionary
         
         Args:
-            model_set: ModelSet model instance
+            model_set: ModelSet model instance or a selected row with the same attribute names
             
         Returns:
-            Dictionary representation
+            Dictionary representation (timestamps are left as datetimes for the response serializer)
         """
-        # Mask API key in config for security
-        config = model_set.config.copy() if model_set.config else {}
-        if model_set.type == 'llm_model' and 'api_key' in config:
-            config['api_key'] = mask_api_key(config['api_key'])
-        
         return {
             'id': model_set.id,
             'name': model_set.name,
             'description': model_set.description,
             'type': model_set.type,
-            'config': config,
-            'created_at': model_set.created_at.isoformat() if model_set.created_at else None,
-            'updated_at': model_set.updated_at.isoformat() if model_set.updated_at else None,
+            'config': _masked_config(model_set.type, model_set.config),
+            'created_at': model_set.created_at,
+            'updated_at': model_set.updated_at,
             'created_by': model_set.created_by,
         }
     
-    def validate_model_set(self, model_set_data: Dict[str, Any], exclude_id: Optional[int] = None) -> Dict[str, str]:
+    def validate_model_set(self, model_set_data: Dict[str, Any]) -> Dict[str, str]:
         """
         Validate model set data
         
         Args:
             model_set_data: Model set data dictionary
-            exclude_id: ID to exclude from uniqueness check (for updates)
             
         Returns:
             Dictionary of validation errors (empty if valid)
+        
+        name uniqueness is not checked here; the unique index rejects duplicates
+        at write time so the common path needs no extra SELECT (or EXISTS).
         """
         errors = {}
         
         if 'name' in model_set_data and not model_set_data.get('name'):
             errors['name'] = 'Name cannot be empty'
         
-        if 'type' in model_set_data:
-            valid_types = ['agent_api', 'llm_model']
-            if model_set_data.get('type') not in valid_types:
-                errors['type'] = f'Type must be one of: {", ".join(valid_types)}'
+        model_set_type = model_set_data.get('type')
+        if 'type' in model_set_data and model_set_type not in _REQUIRED_CONFIG_KEYS:
+            errors['type'] = f'Type must be one of: {", ".join(_REQUIRED_CONFIG_KEYS)}'
         
         if 'config' in model_set_data:
             config = model_set_data.get('config')
@@ -981,15 +1240,9 @@ class ModelSetService:
                 errors['config'] = 'Config must be a dictionary'
             else:
                 # Type-specific validation
-                model_set_type = model_set_data.get('type')
-                if model_set_type == 'agent_api':
-                    if 'api_url' not in config:
-                        errors['config.api_url'] = 'API URL is required for agent_api type'
-                elif model_set_type == 'llm_model':
-                    if 'model_version' not in config:
-                        errors['config.model_version'] = 'Model version is required'
-                    if 'api_key' not in config:
-                        errors['config.api_key'] = 'API key is required'
+                for key, message in _REQUIRED_CONFIG_KEYS.get(model_set_type, ()):
+                    if key not in config:
+                        errors[f'config.{key}'] = message
         
         return errors
 
@@ -1,14 +1,18 @@
 """
 Observability service
 """
+from collections import Counter, defaultdict
 from sqlalchemy.orm import Session
 from typing import List, Optional, Dict, Any, Tuple
 from datetime import datetime, timedelta
-from sqlalchemy import text
-from sqlalchemy.exc import InvalidRequestError, PendingRollbackError
+from sqlalchemy import insert, select, text
+from sqlalchemy.exc import IntegrityError, InvalidRequestError, PendingRollbackError
 import logging
+from app.core.config import settings
+from app.models.experiment import ExperimentResult
 from app.models.trace import Trace, Span
 from app.infra.tracer.span import Span as TracerSpan
+from app.utils.db_errors import is_unique_violation
 
 logger = logging.getLogger(__name__)
 
@@ -75,20 +79,23 @@ class ObservabilityService:
 
     def get_trace(self, trace_id: str) -> Optional[Trace]:
         """Get trace by trace_id"""
-        
-        logger.debug(f"[ObservabilityService] get_trace called with trace_id: '{trace_id}' (type: {type(trace_id).__name__}, length: {len(trace_id) if trace_id else 0})")
+        debug_enabled = logger.isEnabledFor(logging.DEBUG)
         
         # Ensure trace_id is a string
         if not isinstance(trace_id, str):
+            logger.debug("[ObservabilityService] Converting trace_id of type %s to string", type(trace_id).__name__)
             trace_id = str(trace_id)
-            logger.debug(f"[ObservabilityService] Converted trace_id to string: '{trace_id}'")
+        
+        if debug_enabled:
+            logger.debug(f"[ObservabilityService] get_trace called with trace_id: '{trace_id}' (length: {len(trace_id)})")
         
         trace = self.db.query(Trace).filter(Trace.trace_id == trace_id).first()
         
         if trace:
-            logger.debug(f"[ObservabilityService] Found trace: id={trace.id}, trace_id='{trace.trace_id}', service_name='{trace.service_name}'")
-        else:
-            # Log all trace_ids in database for debugging (limit to 10 to avoid performance issues)
+            if debug_enabled:
+                logger.debug(f"[ObservabilityService] Found trace: id={trace.id}, trace_id='{trace.trace_id}', service_name='{trace.service_name}'")
+        elif debug_enabled and settings.DEBUG_TRACE_SAMPLE:
+            # Log some trace_ids in database for debugging (limit to 10 to avoid performance issues)
             sample_traces = self.db.query(Trace.trace_id).limit(10).all()
             logger.debug(f"[ObservabilityService] Trace not found. Sample trace_ids in database: {[t[0] for t in sample_traces]}")
         
@@ -138,7 +145,6 @@ class ObservabilityService:
         )
         self.db.add(span)
         self.db.commit()
-        self.db.refresh(span)
         return span
 
     def get_span(self, span_id: str) -> Optional[Span]:
@@ -183,11 +189,21 @@ class ObservabilityService:
 
     def get_trace_with_spans(self, trace_id: str) -> Dict[str, Any]:
         """Get trace with all its spans"""
-        
-        logger.debug(f"[ObservabilityService] get_trace_with_spans called with trace_id: {trace_id} (type: {type(trace_id).__name__})")
-        
-        trace = self.get_trace(trace_id)
-        if not trace:
+        debug_enabled = logger.isEnabledFor(logging.DEBUG)
+        
+        if debug_enabled:
+            logger.debug(f"[ObservabilityService] get_trace_with_spans called with trace_id: {trace_id} (type: {type(trace_id).__name__})")
+        
+        # Load the trace and its spans in one round trip with an outer join
+        # (the trace comes back once per span, or once with None if it has none)
+        rows = (
+            self.db.query(Trace, Span)
+            .outerjoin(Span, Span.trace_id == Trace.trace_id)
+            .filter(Trace.trace_id == str(trace_id))
+            .order_by(Span.start_time)
+            .all()
+        )
+        if not rows:
             logger.warning(f"[ObservabilityService] Trace {trace_id} not found in database")
             # Return empty structure instead of None to avoid 404
             return {
@@ -195,51 +211,62 @@ class ObservabilityService:
                 "spans": [],
             }
         
-        logger.debug(f"[ObservabilityService] Found trace {trace_id}, querying spans...")
-        spans = self.list_spans(trace_id)
-        logger.debug(f"[ObservabilityService] Found {len(spans)} spans for trace {trace_id}")
+        spans = [span for _, span in rows if span is not None]
+        if debug_enabled:
+            logger.debug(f"[ObservabilityService] Found {len(spans)} spans for trace {trace_id}")
         
         return {
-            "trace": trace,
+            "trace": rows[0][0],
             "spans": spans,
         }
     
     # Batch operations
     def batch_create_traces(self, traces_data: List[Dict[str, Any]]) -> List[Trace]:
         """Batch create traces"""
-        traces = []
-        for trace_data in traces_data:
-            trace = Trace(
-                trace_id=trace_data.get("trace_id"),
-                service_name=trace_data.get("service_name"),
-                operation_name=trace_data.get("operation_name"),
-                start_time=trace_data.get("start_time", datetime.utcnow()),
-                end_time=trace_data.get("end_time"),
-                duration_ms=trace_data.get("duration_ms"),
-                status_code=trace_data.get("status_code"),
-                attributes=trace_data.get("attributes"),
-            )
-            traces.append(trace)
-            self.db.add(trace)
+        if not traces_data:
+            return []
+        
+        now = datetime.utcnow()
+        rows = [
+            {
+                "trace_id": trace_data.get("trace_id"),
+                "service_name": trace_data.get("service_name"),
+                "operation_name": trace_data.get("operation_name"),
+                "start_time": trace_data.get("start_time", now),
+                "end_time": trace_data.get("end_time"),
+                "duration_ms": trace_data.get("duration_ms"),
+                "status_code": trace_data.get("status_code"),
+                "attributes": trace_data.get("attributes"),
+                "created_at": now,
+            }
+            for trace_data in traces_data
+        ]
         
+        # One executemany INSERT on the table (sent as multi-row VALUES by the driver)
+        # instead of per-object ORM inserts; MySQL has no RETURNING, so the rows are
+        # loaded back with a single SELECT rather than a refresh per trace
+        self.db.execute(insert(Trace.__table__), rows)
         self.db.commit()
-        for trace in traces:
-            self.db.refresh(trace)
-        return traces
+        
+        trace_ids = [row["trace_id"] for row in rows]
+        traces_by_id = {
+            trace.trace_id: trace
+            for trace in self.db.query(Trace).filter(Trace.trace_id.in_(trace_ids)).all()
+        }
+        return [traces_by_id[trace_id] for trace_id in trace_ids]
     
     def batch_create_spans(self, spans_data: List[Dict[str, Any]]) -> List[Span]:
         """Batch create spans with individual error handling"""
         
-        spans = []
         successful_spans = []
         failed_spans = []
         
         # Check for duplicate span_ids before attempting to save
-        span_ids = [span_data.get("span_id") for span_data in spans_data if span_data.get("span_id")]
-        duplicate_span_ids = [span_id for span_id in span_ids if span_ids.count(span_id) > 1]
+        span_ids = [span_id for span_id in (span_data.get("span_id") for span_data in spans_data) if span_id]
+        duplicate_span_ids = {span_id for span_id, count in Counter(span_ids).items() if count > 1}
         if duplicate_span_ids:
-            logger.error(f"[ObservabilityService] Found duplicate span_ids: {set(duplicate_span_ids)}")
-            raise ValueError(f"Duplicate span_ids found: {set(duplicate_span_ids)}")
+            logger.error(f"[ObservabilityService] Found duplicate span_ids: {duplicate_span_ids}")
+            raise ValueError(f"Duplicate span_ids found: {duplicate_span_ids}")
         
         # Check for existing span_ids in database
         existing_span_ids = set()
@@ -251,78 +278,68 @@ class ObservabilityService:
         
         logger.info(f"[ObservabilityService] Processing {len(spans_data)} spans for batch creation")
         
-        # Process each span individually to catch errors
+        # Validate each span individually and collect insert rows
+        now = datetime.utcnow()
+        rows = []
         for idx, span_data in enumerate(spans_data):
             span_id = span_data.get("span_id")
             span_name = span_data.get("name", "unknown")
             
+            # Skip if span_id already exists (it is loaded with the new spans below)
+            if span_id in existing_span_ids:
+                logger.warning(f"[ObservabilityService] Span {idx} ({span_name}, span_id={span_id}) already exists, skipping")
+                continue
+            
+            # Validate required fields
+            if not span_id:
+                logger.error(f"[ObservabilityService] Span {idx} ({span_name}) missing span_id, skipping")
+                failed_spans.append({"index": idx, "name": span_name, "error": "Missing span_id"})
+                continue
+            
+            if not span_data.get("trace_id"):
+                logger.error(f"[ObservabilityService] Span {idx} ({span_name}, span_id={span_id}) missing trace_id, skipping")
+                failed_spans.append({"index": idx, "name": span_name, "span_id": span_id, "error": "Missing trace_id"})
+                continue
+            
+            rows.append({
+                "trace_id": span_data.get("trace_id"),
+                "span_id": span_id,
+                "parent_span_id": span_data.get("parent_span_id"),
+                "name": span_name,
+                "kind": span_data.get("kind"),
+                "start_time": span_data.get("start_time", now),
+                "end_time": span_data.get("end_time"),
+                "duration_ms": span_data.get("duration_ms"),
+                "status_code": span_data.get("status_code"),
+                "status_message": span_data.get("status_message"),
+                "attributes": span_data.get("attributes"),
+                "events": span_data.get("events"),
+                "links": span_data.get("links"),
+                "created_at": now,
+            })
+        
+        # Insert all new spans with one executemany on the table (the driver sends
+        # multi-row VALUES) and commit at once
+        if rows:
             try:
-                # Skip if span_id already exists
-                if span_id in existing_span_ids:
-                    logger.warning(f"[ObservabilityService] Span {idx} ({span_name}, span_id={span_id}) already exists, skipping")
-                    # Try to fetch existing span
-                    existing_span = self.db.query(Span).filter(Span.span_id == span_id).first()
-                    if existing_span:
-                        successful_spans.append(existing_span)
-                    continue
-                
-                # Validate required fields
-                if not span_id:
-                    logger.error(f"[ObservabilityService] Span {idx} ({span_name}) missing span_id, skipping")
-                    failed_spans.append({"index": idx, "name": span_name, "error": "Missing span_id"})
-                    continue
-                
-                if not span_data.get("trace_id"):
-                    logger.error(f"[ObservabilityService] Span {idx} ({span_name}, span_id={span_id}) missing trace_id, skipping")
-                    failed_spans.append({"index": idx, "name": span_name, "span_id": span_id, "error": "Missing trace_id"})
-                    continue
-                
-                # Create span object
-                span = Span(
-                    trace_id=span_data.get("trace_id"),
-                    span_id=span_id,
-                    parent_span_id=span_data.get("parent_span_id"),
-                    name=span_name,
-                    kind=span_data.get("kind"),
-                    start_time=span_data.get("start_time", datetime.utcnow()),
-                    end_time=span_data.get("end_time"),
-                    duration_ms=span_data.get("duration_ms"),
-                    status_code=span_data.get("status_code"),
-                    status_message=span_data.get("status_message"),
-                    attributes=span_data.get("attributes"),
-                    events=span_data.get("events"),
-                    links=span_data.get("links"),
-                )
-                
-                # Add to session
-                self.db.add(span)
-                spans.append(span)
-                logger.debug(f"[ObservabilityService] Added span {idx} to session: name={span_name}, span_id={span_id}, parent_span_id={span_data.get('parent_span_id')}")
-                
-            except Exception as e:
-                logger.error(f"[ObservabilityService] Error creating span {idx} ({span_name}, span_id={span_id}): {str(e)}", exc_info=True)
-                failed_spans.append({"index": idx, "name": span_name, "span_id": span_id, "error": str(e)})
-        
-        # Commit all spans at once
-        if spans:
-            try:
-                logger.info(f"[ObservabilityService] Committing {len(spans)} spans to database")
+                logger.info(f"[ObservabilityService] Committing {len(rows)} spans to database")
+                self.db.execute(insert(Span.__table__), rows)
                 self.db.commit()
-                logger.info(f"[ObservabilityService] Successfully committed {len(spans)} spans")
-                
-                # Refresh spans to get database-generated fields
-                for span in spans:
-                    try:
-                        self.db.refresh(span)
-                        successful_spans.append(span)
-                    except Exception as e:
-                        logger.error(f"[ObservabilityService] Error refreshing span {span.span_id}: {str(e)}", exc_info=True)
-                        failed_spans.append({"span_id": span.span_id, "error": f"Refresh error: {str(e)}"})
+                logger.info(f"[ObservabilityService] Successfully committed {len(rows)} spans")
             except Exception as e:
                 logger.error(f"[ObservabilityService] Error committing spans: {str(e)}", exc_info=True)
                 self.db.rollback()
                 raise
         
+        # Load the new and already existing spans with one query (MySQL has no RETURNING)
+        saved_span_ids = [row["span_id"] for row in rows] + [span_id for span_id in span_ids if span_id in existing_span_ids]
+        if saved_span_ids:
+            spans_by_id = {
+                span.span_id: span
+                for span in self.db.query(Span).filter(Span.span_id.in_(saved_span_ids)).all()
+            }
+            successful_spans = [spans_by_id[span_id] for span_id in saved_span_ids if span_id in spans_by_id]
+        
         # Log summary
         logger.info(f"[ObservabilityService] Batch create summary: {len(successful_spans)} successful, {len(failed_spans)} failed")
         if failed_spans:
@@ -333,38 +350,26 @@ class ObservabilityService:
     # Experiment-related queries
     def get_traces_by_experiment_id(self, experiment_id: int, run_id: Optional[int] = None) -> List[Trace]:
         """Get all traces for an experiment"""
-        from app.models.experiment import ExperimentResult
-        
-        # Get unique trace IDs from experiment results
-        query = self.db.query(ExperimentResult.trace_id).filter(
+        # Semi-join on experiment_results so the lookup is one round trip
+        # (an IN subquery rather than JOIN + DISTINCT over the JSON columns)
+        trace_ids = select(ExperimentResult.trace_id).where(
             ExperimentResult.experiment_id == experiment_id,
             ExperimentResult.trace_id.isnot(None)
         )
         
         if run_id:
-            query = query.filter(ExperimentResult.run_id == run_id)
-        
-        trace_ids = [tid[0] for tid in query.distinct().all() if tid[0]]
-        
-        if not trace_ids:
-            return []
+            trace_ids = trace_ids.where(ExperimentResult.run_id == run_id)
         
         return self.db.query(Trace).filter(Trace.trace_id.in_(trace_ids)).order_by(Trace.start_time.desc()).all()
     
     def get_traces_by_run_id(self, run_id: int) -> List[Trace]:
         """Get all traces for a specific run"""
-        from app.models.experiment import ExperimentResult
-        
-        trace_ids = self.db.query(ExperimentResult.trace_id).filter(
+        trace_ids = select(ExperimentResult.trace_id).where(
             ExperimentResult.run_id == run_id,
             ExperimentResult.trace_id.isnot(None)
-        ).distinct().all()
-        
-        if not trace_ids:
-            return []
+        )
         
-        trace_id_list = [tid[0] for tid in trace_ids]
-        return self.db.query(Trace).filter(Trace.trace_id.in_(trace_id_list)).order_by(Trace.start_time.desc()).all()
+        return self.db.query(Trace).filter(Trace.trace_id.in_(trace_ids)).order_by(Trace.start_time.desc()).all()
     
     def save_tracer_span(self, span: TracerSpan) -> Span:
         """Save a tracer span to database"""
@@ -388,22 +393,6 @@ class ObservabilityService:
         except Exception as e:
             logger.warning(f"[ObservabilityService] Failed to ensure session validity in save_span: {str(e)}")
         
-        # Check if span already exists (avoid duplicate save)
-        try:
-            existing_span = self.get_span(span.span_id)
-        except (InvalidRequestError, PendingRollbackError) as e:
-            logger.error(f"[ObservabilityService] Database session error in save_span (get_span): {type(e).__name__}: {str(e)}")
-            # Try to recover and retry once
-            try:
-                self._ensure_session_valid()
-                existing_span = self.get_span(span.span_id)
-            except Exception as retry_error:
-                logger.error(f"[ObservabilityService] Failed to recover session in save_span (get_span): {str(retry_error)}")
-                raise
-        if existing_span:
-            logger.debug(f"[ObservabilityService] Span {span.span_id} already exists, skipping save")
-            return existing_span
-        
         # Determine if this is root span (parent_span_id is None or empty)
         is_root_span = not span.parent_span_id or span.parent_span_id == ""
         
@@ -440,92 +429,33 @@ class ObservabilityService:
                 }
                 trace = self.create_trace(trace_data)
         
-        # Save span with error handling for unique constraint
+        span_data = span.to_dict()
+        span_data["trace_id"] = span.trace_id
+        
+        # Insert directly: the unique span_id index rejects a span that was already
+        # saved, so no existence check or post-insert verification query is needed
         try:
-            # Ensure session is still valid before creating span
-            try:
-                self._ensure_session_valid()
-            except Exception as e:
-                logger.warning(f"[ObservabilityService] Failed to ensure session validity before create_span: {str(e)}")
-            
-            span_data = span.to_dict()
-            span_data["trace_id"] = span.trace_id
-            logger.info(f"[ObservabilityService] 🔄 Attempting to save span: span_id={span.span_id}, name={span.name}, trace_id={span.trace_id}, parent_span_id={span.parent_span_id}")
-            logger.info(f"[ObservabilityService]   - span_data keys: {list(span_data.keys())}")
-            
-            saved_span = self.create_span(span_data)
-            
-            # Verify span was actually saved to database
-            if saved_span:
-                logger.info(f"[ObservabilityService] ✅ Span created via create_span: span_id={saved_span.span_id}, db_id={saved_span.id if hasattr(saved_span, 'id') else 'N/A'}")
-                
-                # Double-check by querying database
-                verified_span = self.get_span(span.span_id)
-                if verified_span:
-                    logger.info(f"[ObservabilityService] ✅ VERIFIED: Span {span.span_id} exists in database (db_id={verified_span.id if hasattr(verified_span, 'id') else 'N/A'})")
-                else:
-                    logger.error(f"[ObservabilityService] ❌ CRITICAL: Span {span.span_id} was created but NOT found in database!")
-                
-                logger.info(f"[ObservabilityService] ✅ Successfully saved span {span.span_id} (name={span.name}, parent={span.parent_span_id}, is_root={is_root_span})")
-                return saved_span
-            else:
-                logger.error(f"[ObservabilityService] ❌ CRITICAL: create_span returned None! span_id={span.span_id}")
-                return None
-                
-        except (InvalidRequestError, PendingRollbackError) as e:
-            logger.error(f"[ObservabilityService] ❌ Database session error saving span {span.span_id}: {type(e).__name__}: {str(e)}")
-            # Try to recover and retry once
             try:
+                saved_span = self.create_span(span_data)
+            except (InvalidRequestError, PendingRollbackError) as e:
+                logger.error(f"[ObservabilityService] Database session error saving span {span.span_id}: {type(e).__name__}: {str(e)}")
+                # Recover the session and retry once
                 self._ensure_session_valid()
-                # Retry saving the span
-                span_data = span.to_dict()
-                span_data["trace_id"] = span.trace_id
                 saved_span = self.create_span(span_data)
-                if saved_span:
-                    logger.info(f"[ObservabilityService] ✅ Successfully saved span {span.span_id} after session recovery")
-                    return saved_span
-            except Exception as retry_error:
-                logger.error(f"[ObservabilityService] Failed to recover session and retry: {str(retry_error)}")
-            # If recovery failed, check if it's a unique constraint (span might have been saved before error)
-            try:
-                existing = self.get_span(span.span_id)
-                if existing:
-                    logger.info(f"[ObservabilityService] ✅ Found existing span {span.span_id} after session error (db_id={existing.id if hasattr(existing, 'id') else 'N/A'})")
-                    return existing
-            except Exception:
-                pass
-            # Re-raise if we couldn't recover
-            raise
-        except Exception as e:
-            # Check if it's a unique constraint violation
-            error_str = str(e).lower()
-            if "unique" in error_str or "duplicate" in error_str:
-                logger.warning(f"[ObservabilityService] ⚠️ Span {span.span_id} already exists (unique constraint), fetching existing")
-                try:
-                    existing = self.get_span(span.span_id)
-                    if existing:
-                        logger.info(f"[ObservabilityService] ✅ Found existing span {span.span_id} in database (db_id={existing.id if hasattr(existing, 'id') else 'N/A'})")
-                        return existing
-                    else:
-                        logger.error(f"[ObservabilityService] ❌ CRITICAL: Unique constraint error but span {span.span_id} not found in database!")
-                except (InvalidRequestError, PendingRollbackError) as get_error:
-                    logger.error(f"[ObservabilityService] Database session error fetching existing span: {type(get_error).__name__}: {str(get_error)}")
-                    # Try to recover
-                    try:
-                        self._ensure_session_valid()
-                        existing = self.get_span(span.span_id)
-                        if existing:
-                            return existing
-                    except Exception:
-                        pass
-            # Re-raise if it's a different error
-            logger.error(f"[ObservabilityService] ❌ ERROR saving span {span.span_id}: {str(e)}", exc_info=True)
-            logger.error(f"[ObservabilityService]   - Exception type: {type(e).__name__}")
-            logger.error(f"[ObservabilityService]   - Exception args: {e.args}")
-            raise
+        except IntegrityError as e:
+            self.db.rollback()
+            if not is_unique_violation(e):
+                logger.error(f"[ObservabilityService] Error saving span {span.span_id}: {str(e)}", exc_info=True)
+                raise
+            logger.debug("[ObservabilityService] Span %s already exists, skipping save", span.span_id)
+            return self.get_span(span.span_id)
+        
+        logger.info(f"[ObservabilityService] Saved span {span.span_id} (name={span.name}, parent={span.parent_span_id}, is_root={is_root_span})")
+        return saved_span
     
     def save_trace_and_spans(self, trace_data: Dict[str, Any], spans: List[TracerSpan]) -> Trace:
         """Save a trace and its spans to database"""
+        debug_enabled = logger.isEnabledFor(logging.DEBUG)
         
         trace_id = trace_data.get('trace_id')
         logger.info(f"[ObservabilityService] ========== Saving trace {trace_id} with {len(spans)} spans ==========")
@@ -535,16 +465,17 @@ class ObservabilityService:
             logger.warning(f"[ObservabilityService] No spans provided for trace {trace_id}")
         else:
             # Log all spans before processing
-            logger.info(f"[ObservabilityService] Spans to save:")
-            for idx, span in enumerate(spans):
-                logger.info(f"[ObservabilityService]   Span {idx}: name='{span.name}', span_id='{span.span_id}', parent_span_id='{span.parent_span_id}', finished={getattr(span, '_is_finished', 'unknown')}")
+            if debug_enabled:
+                logger.debug(f"[ObservabilityService] Spans to save:")
+                for idx, span in enumerate(spans):
+                    logger.debug(f"[ObservabilityService]   Span {idx}: name='{span.name}', span_id='{span.span_id}', parent_span_id='{span.parent_span_id}', finished={getattr(span, '_is_finished', 'unknown')}")
             
             # Check for duplicate span_ids in the list
             span_ids = [getattr(span, 'span_id', None) for span in spans]
             unique_span_ids = set(span_ids)
             if len(span_ids) != len(unique_span_ids):
-                duplicates = [span_id for span_id in span_ids if span_ids.count(span_id) > 1]
-                logger.error(f"[ObservabilityService] Found duplicate span_ids in spans list: {set(duplicates)}")
+                duplicates = {span_id for span_id, count in Counter(span_ids).items() if count > 1}
+                logger.error(f"[ObservabilityService] Found duplicate span_ids in spans list: {duplicates}")
                 for idx, span in enumerate(spans):
                     if span.span_id in duplicates:
                         logger.error(f"[ObservabilityService]   Duplicate span at index {idx}: name='{span.name}', span_id='{span.span_id}'")
@@ -573,7 +504,8 @@ class ObservabilityService:
                 span_dict = span.to_dict()
                 span_dict["trace_id"] = trace.trace_id
                 span_data_list.append(span_dict)
-                logger.debug(f"[ObservabilityService] Prepared span {idx}: name={span.name}, span_id={span.span_id}, parent_span_id={span.parent_span_id}")
+                if debug_enabled:
+                    logger.debug(f"[ObservabilityService] Prepared span {idx}: name={span.name}, span_id={span.span_id}, parent_span_id={span.parent_span_id}")
             except Exception as e:
                 logger.error(f"[ObservabilityService] Error preparing span {idx} ({getattr(span, 'name', 'unknown')}): {str(e)}", exc_info=True)
         
@@ -587,12 +519,12 @@ class ObservabilityService:
                 if len(saved_spans) != len(span_data_list):
                     logger.warning(f"[ObservabilityService] Span count mismatch: expected {len(span_data_list)}, saved {len(saved_spans)}")
                 
-                # Query database to verify spans were saved
-                saved_span_ids = [span.span_id for span in saved_spans]
-                db_spans = self.db.query(Span).filter(Span.trace_id == trace_id).all()
-                logger.info(f"[ObservabilityService] Verified: {len(db_spans)} spans found in database for trace {trace_id}")
-                for db_span in db_spans:
-                    logger.debug(f"[ObservabilityService]   DB span: name='{db_span.name}', span_id='{db_span.span_id}', parent_span_id='{db_span.parent_span_id}'")
+                # Query database to verify spans were saved (debug only: an extra round trip per save)
+                if debug_enabled and settings.DEBUG_TRACE_SAMPLE:
+                    db_spans = self.db.query(Span).filter(Span.trace_id == trace_id).all()
+                    logger.debug(f"[ObservabilityService] Verified: {len(db_spans)} spans found in database for trace {trace_id}")
+                    for db_span in db_spans:
+                        logger.debug(f"[ObservabilityService]   DB span: name='{db_span.name}', span_id='{db_span.span_id}', parent_span_id='{db_span.parent_span_id}'")
             except Exception as e:
                 logger.error(f"[ObservabilityService] Error batch creating spans: {str(e)}", exc_info=True)
                 raise
@@ -612,19 +544,24 @@ class ObservabilityService:
         # Create a map of span_id -> span
         span_map = {span.span_id: span for span in spans}
         
-        # Find root spans (spans without parent)
-        root_spans = [span for span in spans if not span.parent_span_id or span.parent_span_id not in span_map]
-        
-        def build_tree(span: Span) -> Dict[str, Any]:
-            """Recursively build tree for a span"""
-            children = [s for s in spans if s.parent_span_id == span.span_id]
-            return {
-                "span": span,
-                "children": [build_tree(child) for child in children],
-            }
-        
-        # Build tree for each root span
-        trees = [build_tree(root) for root in root_spans]
+        # Find root spans (spans without parent) and bucket the rest by parent in one pass
+        root_spans = []
+        children_of = defaultdict(list)
+        for span in spans:
+            if not span.parent_span_id or span.parent_span_id not in span_map:
+                root_spans.append(span)
+            else:
+                children_of[span.parent_span_id].append(span)
+        
+        # Build tree for each root span iteratively (no recursion limit on deep traces)
+        trees = [{"span": root, "children": []} for root in root_spans]
+        stack = list(trees)
+        while stack:
+            node = stack.pop()
+            for child in children_of.get(node["span"].span_id, ()):
+                child_node = {"span": child, "children": []}
+                node["children"].append(child_node)
+                stack.append(child_node)
         
         return {
             "trace_id": trace_id,
@@ -11,37 +11,41 @@ import logging
 
 logger = logging.getLogger(__name__)
 
-# Cache the Fernet instance
-_fernet_instance = None
+
+def _derive_key() -> bytes:
+    """
+    Derive a stable 32-byte Fernet key from SECRET_KEY using PBKDF2.
+    
+    Returns:
+        URL-safe base64 encoded key
+    """
+    secret_key = settings.SECRET_KEY.encode('utf-8')
+    salt = b'evalverse_salt'  # Fixed salt for consistency
+    
+    kdf = PBKDF2HMAC(
+        algorithm=hashes.SHA256(),
+        length=32,
+        salt=salt,
+        iterations=100000,
+        backend=default_backend()
+    )
+    
+    return base64.urlsafe_b64encode(kdf.derive(secret_key))
+
+
+# Derived once at import so the PBKDF2 cost never lands on a request and
+# concurrent first calls can't each repeat the derivation
+_FERNET = Fernet(_derive_key())
 
 
 def get_fernet() -> Fernet:
     """
-    Get or create a Fernet instance for encryption/decryption.
-    Uses SECRET_KEY to derive a stable encryption key.
+    Get the shared Fernet instance for encryption/decryption.
     
     Returns:
         Fernet instance
     """
-    global _fernet_instance
-    
-    if _fernet_instance is None:
-        # Derive a 32-byte key from SECRET_KEY using PBKDF2
-        secret_key = settings.SECRET_KEY.encode('utf-8')
-        salt = b'evalverse_salt'  # Fixed salt for consistency
-        
-        kdf = PBKDF2HMAC(
-            algorithm=hashes.SHA256(),
-            length=32,
-            salt=salt,
-            iterations=100000,
-            backend=default_backend()
-        )
-        
-        key = base64.urlsafe_b64encode(kdf.derive(secret_key))
-        _fernet_instance = Fernet(key)
-    
-    return _fernet_instance
+    return _FERNET
 
 
 def encrypt_api_key(api_key: str) -> str:
@@ -58,8 +62,7 @@ def encrypt_api_key(api_key: str) -> str:
         return api_key
     
     try:
-        fernet = get_fernet()
-        encrypted = fernet.encrypt(api_key.encode('utf-8'))
+        encrypted = _FERNET.encrypt(api_key.encode('utf-8'))
         return encrypted.decode('utf-8')
     except Exception as e:
         logger.error(f"Failed to encrypt API key: {str(e)}")
@@ -86,8 +89,7 @@ def decrypt_api_key(encrypted: str) -> str:
         return encrypted
     
     try:
-        fernet = get_fernet()
-        decrypted = fernet.decrypt(encrypted.encode('utf-8'))
+        decrypted = _FERNET.decrypt(encrypted.encode('utf-8'))
         return decrypted.decode('utf-8')
     except Exception as e:
         logger.warning(f"Failed to decrypt API key (might be plain text): {str(e)}")
@@ -0,0 +1,28 @@
+"""
+Database error helpers
+"""
+from sqlalchemy.exc import IntegrityError
+
+# MySQL ER_DUP_ENTRY
+_MYSQL_DUPLICATE_ENTRY = 1062
+# PostgreSQL unique_violation
+_POSTGRES_UNIQUE_VIOLATION = '23505'
+
+
+def is_unique_violation(error: IntegrityError) -> bool:
+    """
+    Check whether an IntegrityError was caused by a unique constraint/index
+    
+    Args:
+        error: IntegrityError raised by SQLAlchemy
+        
+    Returns:
+        True if the error is a duplicate-key violation
+    """
+    orig = error.orig
+    if getattr(orig, 'pgcode', None) == _POSTGRES_UNIQUE_VIOLATION:
+        return True
+    args = getattr(orig, 'args', ())
+    if args and args[0] == _MYSQL_DUPLICATE_ENTRY:
+        return True
+    return 'UNIQUE constraint failed' in str(orig)
@@ -0,0 +1,31 @@
+"""
+Database feature detection helpers
+"""
+from sqlalchemy.orm import Session
+
+# Minimum server versions with window function (OVER) support
+_WINDOW_FUNCTION_MIN_VERSIONS = {
+    'mysql': (8, 0),
+    'mariadb': (10, 2),
+    'sqlite': (3, 25),
+}
+
+
+def supports_window_functions(db: Session) -> bool:
+    """
+    Check whether the session's database server supports window functions
+    
+    MySQL only has them from 8.0; on 5.7 a COUNT(*) OVER () is a syntax error.
+    
+    Args:
+        db: Database session (its connection is used to read the server version)
+    
+    Returns:
+        True if OVER () clauses can be used
+    """
+    dialect = db.connection().dialect
+    name = 'mariadb' if getattr(dialect, 'is_mariadb', False) else dialect.name
+    min_version = _WINDOW_FUNCTION_MIN_VERSIONS.get(name)
+    if min_version is None:
+        return True
+    return tuple(dialect.server_version_info or ()) >= min_version
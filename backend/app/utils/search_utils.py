@@ -0,0 +1,33 @@
+"""
+Helpers for name search filters
+"""
+from sqlalchemy.orm import Session
+
+# Dialects whose default collation already compares strings case-insensitively
+# (the schema uses utf8mb4_unicode_ci), so ILIKE's LOWER() wrapping is redundant
+_CASE_INSENSITIVE_DIALECTS = frozenset({'mysql', 'mariadb'})
+
+
+def name_search_clause(db: Session, column, term: str, prefix: bool = False):
+    """
+    Build a case-insensitive name search clause for the session's database
+    
+    The term is matched literally: % and _ in it are escaped rather than
+    treated as LIKE wildcards. On MySQL this is a plain LIKE, which avoids
+    evaluating LOWER() on every row and lets the optimizer use the column
+    index for prefix matches. Other databases fall back to ILIKE.
+    
+    Args:
+        db: Database session (used to detect the dialect)
+        column: Column to match
+        term: Search text entered by the user
+        prefix: Match names starting with term ("term%", index-friendly)
+            instead of names containing it ("%term%")
+    """
+    if db.get_bind().dialect.name in _CASE_INSENSITIVE_DIALECTS:
+        if prefix:
+            return column.startswith(term, autoescape=True)
+        return column.contains(term, autoescape=True)
+    if prefix:
+        return column.istartswith(term, autoescape=True)
+    return column.icontains(term, autoescape=True)
@@ -4,6 +4,7 @@ FastAPI application entry point
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from app.core.config import settings
+from app.core.http_client import close_http_client
 from app.api.v1 import dataset, evaluator, evaluator_record, experiment, experiment_group, observability, model_config, model_set, prompt
 
 app = FastAPI(
@@ -36,6 +37,11 @@ app.include_router(model_set.router, prefix="/api/v1/model-sets", tags=["model-s
 app.include_router(prompt.router, prefix="/api/v1/prompts", tags=["prompts"])
 
 
+@app.on_event("shutdown")
+async def shutdown():
+    await close_http_client()
+
+
 @app.get("/")
 async def root():
     return {"message": "EvalVerse API", "version": "1.0.0"}
@@ -200,7 +200,7 @@ CREATE TABLE IF NOT EXISTS `experiments` (
   `created_by` VARCHAR(100),
   PRIMARY KEY (`id`),
   KEY `ix_experiments_id` (`id`),
-  KEY `ix_experiments_name` (`name`),
+  UNIQUE KEY `ix_experiments_name` (`name`),
   CONSTRAINT `experiments_ibfk_1` FOREIGN KEY (`dataset_version_id`) REFERENCES `dataset_versions` (`id`)
 ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
 
@@ -239,6 +239,8 @@ CREATE TABLE IF NOT EXISTS `experiment_results` (
   PRIMARY KEY (`id`),
   KEY `ix_experiment_results_id` (`id`),
   KEY `idx_experiment_result_trace_id` (`trace_id`),
+  KEY `idx_result_experiment_trace` (`experiment_id`, `trace_id`),
+  KEY `idx_result_run_trace` (`run_id`, `trace_id`),
   CONSTRAINT `experiment_results_ibfk_1` FOREIGN KEY (`experiment_id`) REFERENCES `experiments` (`id`),
   CONSTRAINT `experiment_results_ibfk_2` FOREIGN KEY (`run_id`) REFERENCES `experiment_runs` (`id`),
   CONSTRAINT `experiment_results_ibfk_3` FOREIGN KEY (`dataset_item_id`) REFERENCES `dataset_items` (`id`),
@@ -309,7 +311,7 @@ CREATE TABLE IF NOT EXISTS `model_sets` (
   `type` VARCHAR(50) NOT NULL,
   `config` JSON NOT NULL,
   `created_at` DATETIME,
-  `updated_at` DATETIME,
+  `updated_at` DATETIME(6),
   `created_by` VARCHAR(100),
   PRIMARY KEY (`id`),
   UNIQUE KEY `ix_model_sets_name` (`name`),